@@ -1,9 +1,36 @@
 import streamlit as st
 from langchain_community.llms import Ollama
 from langchain_core.prompts import ChatPromptTemplate
+from functools import lru_cache
 from typing import List, Dict
 import json
-import re
+
+from lib.country_lookup import prevalidate_location
+from lib.llm_cache import cached_completion
+
+MODEL = "mistral"
+JSON_ONLY_SYSTEM = "You are a helpful assistant. ONLY return valid JSON. DO NOT add any commentary, notes, or explanation before or after. Output ONLY the JSON array as a raw value."
+PLAIN_SYSTEM = "You are a helpful assistant."
+
+
+@lru_cache(maxsize=None)
+def get_chain(system: str, model: str = MODEL):
+    """Prompt + model chain, built once per system prompt instead of per call."""
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", system), ("human", "{input}")]
+    )
+    return prompt | Ollama(model=model)
+
+
+def invoke_cached(system: str, user_input: str, model: str = MODEL) -> str:
+    """Runs the chain, or returns the cached response for the same request."""
+    output, _ = cached_completion(
+        f"ollama:{model}",
+        user_input,
+        lambda: get_chain(system, model).invoke({"input": user_input}),
+        system=system,
+    )
+    return output
 
 
 def extract_recommendations_from_text(
@@ -56,23 +83,7 @@ Here is the user input:
 ---
 """
 
-    # Load model
-    llm = Ollama(model="mistral")
-
-    # Build a simple prompt
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "You are a helpful assistant. ONLY return valid JSON. DO NOT add any commentary, notes, or explanation before or after. Output ONLY the JSON array as a raw value.",
-            ),
-            ("human", "{input}"),
-        ]
-    )
-
-    # Combine prompt + model into a chain
-    chain = prompt | llm
-    output = chain.invoke({"input": user_input})
+    output = invoke_cached(JSON_ONLY_SYSTEM, user_input, model)
 
     # Try to parse JSON from the model output
     try:
@@ -102,46 +113,20 @@ Here is the user input:
 
 def fix_or_complete_location_data(raw_output: Dict) -> List[Dict]:
     """
-    First asks LLM to analyze if data is complete — without changing it.
-    Then (if needed) asks to correct it.
-    Verdict is parsed from 'Verdict: YES' or 'Verdict: NO'.
+    Checks the record's country and place against the offline country table
+    first; only records that fail those rules (empty place, unknown country,
+    name/code mismatch) are sent to the LLM to be corrected. The old LLM
+    review step is gone: a record the rules reject would get Verdict: NO anyway.
     """
-    llm = Ollama(model="mistral")
-
-    def run_review_prompt():
-        review_prompt = f"""
-    You are a validator checking if the following dataset is valid.
-
-    There are rules:
-    1. 'country' must be a non-empty valid country name.
-    2. 'place' must be a non-empty name of an actual place (city, island, region, etc).
-
-    DO NOT suggest improvements.
-    DO NOT fill in missing data.
-
-    Just answer the following questions one by one:
-    - Is 'country' valid? YES/NO
-    - Is 'place' valid? YES/NO
-
-    Then write: Verdict: YES if ALL fields are valid, otherwise Verdict: NO
-
-    Here is the dataset:
-    ---
-    {json.dumps(raw_output, indent=2)}
-    ---
-
-    Please reason step by step and follow the format exactly.
-    """
-        review_chain = (
-            ChatPromptTemplate.from_messages(
-                [("system", "You are a helpful assistant."), ("human", "{input}")]
-            )
-            | llm
-        )
-        return review_chain.invoke({"input": review_prompt})
-
-    def run_fix_prompt():
-        fix_prompt = f"""
+    nested = isinstance(raw_output.get("location"), dict)
+    check = prevalidate_location(raw_output["location"] if nested else raw_output)
+    if check["status"] == "valid":
+        if nested:
+            return dict(raw_output, location=check["location"])
+        return dict(raw_output, **check["location"])
+
+    problems = "\n".join(f"- {reason}" for reason in check["reasons"])
+    fix_prompt = f"""
 You are a travel data corrector.
 
 Your task is to fix or complete missing or invalid fields in the following record:
@@ -150,6 +135,9 @@ Your task is to fix or complete missing or invalid fields in the following recor
 - NEVER add notes or explanations — just return corrected JSON.
 - Do NOT modify existing valid fields.
 
+Problems found:
+{problems}
+
 Input:
 ---
 {json.dumps(raw_output, indent=2)}
@@ -157,28 +145,9 @@ Input:
 
 Return only the corrected JSON object.
 """
-        fix_chain = (
-            ChatPromptTemplate.from_messages(
-                [
-                    ("system", "You are a helpful assistant."),
-                    ("human", "{input}"),
-                ]
-            )
-            | llm
-        )
-        return fix_chain.invoke({"input": fix_prompt})
-
-    # Step 1: Strict review
-    review_response = run_review_prompt()
-    verdict_match = re.search(r"Verdict:\s*(YES|NO)", review_response, re.IGNORECASE)
-    verdict = verdict_match.group(1).strip().upper() if verdict_match else "NO"
-
-    if verdict == "NO":
-        corrected = run_fix_prompt()
-        try:
-            return json.loads(corrected)
-        except Exception as e:
-            st.error(f"Failed to parse corrected LLM output: {e}")
-            st.error(f"Raw correction: {corrected}")
-    else:
-        return raw_output
+    corrected = invoke_cached(PLAIN_SYSTEM, fix_prompt)
+    try:
+        return json.loads(corrected)
+    except Exception as e:
+        st.error(f"Failed to parse corrected LLM output: {e}")
+        st.error(f"Raw correction: {corrected}")
@@ -1,25 +1,38 @@
 import streamlit as st
 import json
-from jsonschema import validate, ValidationError
+import math
 from datetime import datetime
 
+from lib.async_clients import resolve_many
 from lib.brainstorm_data import (
     brainstorm_item_schema,
     load_brainstorm_data,
-    save_brainstorm_data,
+    upsert_brainstorm_items,
 )
+from lib.bulk_validation import entry_errors, validate_entries
 from lib.cache import time_function
+from lib.llm_provider import generate_entries
+from lib.rerun_tracker import rerun, tracked_fragment
 
+PLACES_PER_PROMPT = 10
+RAW_INPUT_KEY = "add_data_raw_input"
 
-def get_prompt(existing_data, user_suggestions=None):
+
+def get_prompt(existing_data, user_suggestions=None, count=None, batch=None):
     existing_places = ", ".join([place["name"] for place in existing_data])
     suggestion_note = (
         f"The user is particularly interested in: {user_suggestions}"
         if user_suggestions
         else ""
     )
+    count_note = f"Generate {count} destinations." if count else ""
+    if batch and batch[1] > 1:
+        count_note += (
+            f" This is batch {batch[0]} of {batch[1]}, generated in parallel;"
+            " favour less obvious picks in later batches so they don't overlap."
+        )
     return f"""
-You are helping plan a structured, flexible travel itinerary. Based on brainstormed ideas or suggestions, generate a list of compelling travel destinations in JSON format.
+You are helping plan a structured, flexible travel itinerary. Based on brainstormed ideas or suggestions, generate a list of compelling travel destinations in JSON format. {count_note}
 
 You can skip {existing_places} as they are already included.
 
@@ -65,7 +78,94 @@ Output must be a valid JSON array. Avoid nested explanation or markdown — just
 """
 
 
-@st.fragment
+def save_entries(report):
+    """Saves the accepted entries; rejected ones are kept for fixing in step 4."""
+    for entry in report["accepted"]:
+        entry["last_edited_timestamp"] = datetime.utcnow().isoformat()
+    if report["accepted"]:
+        with st.spinner("📍 Locating the new places..."):
+            # Warms the geocoding cache concurrently for the indexes and the map
+            resolve_many(entry["geo_query"] for entry in report["accepted"])
+        upsert_brainstorm_items(report["accepted"])
+
+    if not report["rejected"]:
+        st.success("✅ Entries added successfully!")
+        st.session_state.add_data_step = 0
+        st.session_state.add_data_raw = ""
+        st.session_state.add_data_rejected = None
+        st.session_state.user_suggestions = ""
+        rerun()
+
+    # The text area is already drawn in this run, so the rejects are loaded
+    # into it (and reported) on the rerun
+    st.session_state.add_data_rejected = {
+        "accepted": len(report["accepted"]),
+        "rejected": report["rejected"],
+    }
+    st.session_state.add_data_raw = (
+        "[\n" + ",\n".join(r["raw"] for r in report["rejected"] if r["raw"]) + "\n]"
+    )
+    st.session_state.add_data_raw_reload = True
+    st.session_state.add_data_step = 4  # also when generated in app on step 1
+    rerun()
+
+
+def _show_rejected():
+    report = st.session_state.get("add_data_rejected")
+    if not report:
+        return
+    st.warning(
+        f"Added {report['accepted']} entries, "
+        f"rejected {len(report['rejected'])}. Fix these and append them again:"
+    )
+    for rejected in report["rejected"]:
+        st.error(
+            f"❌ Entry {rejected['index'] + 1}"
+            + (f" ({rejected['id']})" if rejected["id"] else "")
+            + "\n"
+            + "\n".join(f"- {error}" for error in rejected["errors"])
+        )
+
+
+def generate_places(count, user_suggestions=None):
+    """
+    Asks the configured LLM for `count` places in parallel batches and
+    validates entries as they stream in. Returns a `validate_entries` report.
+    """
+    existing = st.session_state.brainstorm_data
+    seen = {item["id"] for item in existing}
+    batches = math.ceil(count / PLACES_PER_PROMPT)
+    prompts = [
+        get_prompt(
+            existing,
+            user_suggestions,
+            count=min(PLACES_PER_PROMPT, count - i * PLACES_PER_PROMPT),
+            batch=(i + 1, batches),
+        )
+        for i in range(batches)
+    ]
+
+    report = {"accepted": [], "rejected": []}
+    progress = st.progress(0.0, text="Asking the model…")
+    for index, (_, entry, error, raw) in enumerate(generate_entries(prompts)):
+        errors = [error] if error else entry_errors(entry, seen)
+        if errors:
+            entry_id = entry.get("id") if isinstance(entry, dict) else None
+            report["rejected"].append(
+                {"index": index, "id": entry_id, "errors": errors, "raw": raw}
+            )
+            continue
+        seen.add(entry["id"])
+        report["accepted"].append(entry)
+        progress.progress(
+            min(len(report["accepted"]) / count, 1.0),
+            text=f"{len(report['accepted'])}/{count} places: {entry['name']}",
+        )
+    progress.empty()
+    return report
+
+
+@tracked_fragment
 def _add_places_fragment():
     step = st.session_state.get("add_data_step", 0)
     st.markdown("## ➕ Add Brainstorm Data")
@@ -78,16 +178,34 @@ def _add_places_fragment():
             help="You can name one or more specific places (comma-separated), describe a vibe like 'remote mountains for hiking', or leave it empty if your chat history already has context.",
         )
 
+        count = st.number_input(
+            "How many places to generate in app",
+            min_value=1,
+            max_value=100,
+            value=PLACES_PER_PROMPT,
+            key="generate_count",
+        )
+
         col1, col2, col3 = st.columns([1, 1, 1])
+        with col1:
+            generate = st.button(
+                "⚡ Generate in app",
+                key="generate_in_app",
+                help="Uses the configured local LLM instead of copy-pasting to ChatGPT.",
+            )
         with col2:
             if st.button("Next →", key="step0_next"):
                 st.session_state.user_suggestions = user_input
                 st.session_state.add_data_step = 2
-                st.rerun(scope="fragment")
+                rerun(scope="fragment")
         with col3:
             if st.button("Cancel", key="step0_cancel"):
                 st.session_state.add_data_step = 0
-                st.rerun(scope="app")
+                rerun(scope="app")
+
+        if generate:
+            st.session_state.user_suggestions = user_input
+            save_entries(generate_places(count, user_input))
 
     elif step == 2:
         st.markdown("### Step 2/4: Copy this prompt")
@@ -99,15 +217,15 @@ def _add_places_fragment():
         with col2:
             if st.button("Next →", key="step1_next"):
                 st.session_state.add_data_step = 3
-                st.rerun(scope="fragment")
+                rerun(scope="fragment")
         with col1:
             if st.button("← Back", key="step1_back"):
                 st.session_state.add_data_step = 1
-                st.rerun(scope="fragment")
+                rerun(scope="fragment")
         with col3:
             if st.button("Cancel", key="step1_cancel"):
                 st.session_state.add_data_step = 0
-                st.rerun(scope="app")
+                rerun(scope="app")
 
     elif step == 3:
         st.markdown("### Step 3/4: Use ChatGPT with the prompt above")
@@ -116,56 +234,47 @@ def _add_places_fragment():
         with col1:
             if st.button("← Back", key="step2_back"):
                 st.session_state.add_data_step = 2
-                st.rerun(scope="fragment")
+                rerun(scope="fragment")
         with col2:
             if st.button("Next →", key="step2_next"):
                 st.session_state.add_data_step = 4
-                st.rerun(scope="fragment")
+                rerun(scope="fragment")
         with col3:
             if st.button("Cancel", key="step2_cancel"):
                 st.session_state.add_data_step = 0
-                st.rerun(scope="app")
+                rerun(scope="app")
 
     elif step == 4:
         st.markdown("### Step 4/4: Paste your new entries")
+        _show_rejected()
+        # Widget state is dropped while the step is hidden, so the text comes
+        # back from add_data_raw; after a partial import it holds the rejects
+        if RAW_INPUT_KEY not in st.session_state or st.session_state.pop(
+            "add_data_raw_reload", False
+        ):
+            st.session_state[RAW_INPUT_KEY] = st.session_state.get("add_data_raw", "")
         raw = st.text_area(
             "Paste entries (JSON array)",
-            placeholder=st.session_state.get("add_data_raw", "[]"),
+            placeholder="[]",
             height=300,
+            key=RAW_INPUT_KEY,
         )
         col1, col2, col3 = st.columns([1, 1, 1])
         with col1:
             if st.button("← Back", key="step3_back"):
                 st.session_state.add_data_raw = raw
                 st.session_state.add_data_step = 3
-                st.rerun(scope="fragment")
+                rerun(scope="fragment")
         with col2:
-            if st.button("✅ Append", key="step3_submit"):
-                try:
-                    entries = json.loads(raw)
-                    if not isinstance(entries, list):
-                        raise ValueError("Must be a JSON array")
-
-                    for i, entry in enumerate(entries):
-                        validate(instance=entry, schema=brainstorm_item_schema)
-                        entry["last_edited_timestamp"] = datetime.utcnow().isoformat()
-
-                    st.session_state.brainstorm_data.extend(entries)
-                    save_brainstorm_data(st.session_state.brainstorm_data)
-
-                    st.success("✅ Entries added successfully!")
-                    st.session_state.add_data_step = 0
-                    st.session_state.add_data_raw = "[]"
-                    st.session_state.user_suggestions = ""
-                    st.rerun()
-
-                except (json.JSONDecodeError, ValidationError, ValueError) as e:
-                    st.error(f"❌ Validation failed: {e}")
-
+            submitted = st.button("✅ Append", key="step3_submit")
         with col3:
             if st.button("Cancel", key="step3_cancel"):
                 st.session_state.add_data_step = 0
-                st.rerun(scope="app")
+                rerun(scope="app")
+
+        if submitted:
+            existing_ids = {item["id"] for item in st.session_state.brainstorm_data}
+            save_entries(validate_entries(raw, existing_ids))
 
 
 @time_function
@@ -1,6 +1,7 @@
 import streamlit as st
 from datetime import datetime
-from lib.db import update_app_data
+from lib.itinerary import get_itinerary, save_itinerary
+from lib.rerun_tracker import rerun
 
 
 @st.dialog("➕ Add to Itinerary", width="large")
@@ -26,7 +27,7 @@ def show_add_to_itinerary_dialog(item):
     # Handle toggle for date input
     if st.session_state["use_target_date"] != checkbox_value:
         st.session_state["use_target_date"] = checkbox_value
-        st.rerun(scope="fragment")
+        rerun(scope="fragment")
 
     if st.session_state["use_target_date"]:
         st.session_state["target_date"] = st.date_input(
@@ -55,10 +56,8 @@ def show_add_to_itinerary_dialog(item):
             "added_timestamp": datetime.now().isoformat(),
         }
 
-        itinerary = st.session_state.get("itinerary_data", [])
-        itinerary = [entry for entry in itinerary if entry["id"] != item["id"]]
-        itinerary.append(new_entry)
-
-        update_app_data("itinerary_data", itinerary)
+        itinerary = get_itinerary()
+        itinerary.add(new_entry)  # replaces an earlier entry for this place
+        save_itinerary(itinerary)
         st.success("✅ Saved to itinerary")
-        st.rerun()
+        rerun()
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from lib.geo_resolver import resolve_geo_query
+from lib.image_fetcher import search_unsplash
+
+# Lookups in flight per service. Each one mostly waits on DynamoDB or the
+# network; http_client still spaces the actual Nominatim requests a second apart.
+GEO_CONCURRENCY = 8
+UNSPLASH_CONCURRENCY = 4
+
+
+async def aresolve_geo_query(query: str, require_polygon: bool = False, semaphore=None):
+    """resolve_geo_query on a worker thread, optionally bounded by `semaphore`."""
+    if semaphore is None:
+        return await asyncio.to_thread(resolve_geo_query, query, require_polygon)
+    async with semaphore:
+        return await asyncio.to_thread(resolve_geo_query, query, require_polygon)
+
+
+async def asearch_unsplash(
+    query: str, count=3, orientation="landscape", semaphore=None
+):
+    """search_unsplash on a worker thread, optionally bounded by `semaphore`."""
+    if semaphore is None:
+        return await asyncio.to_thread(search_unsplash, query, count, orientation)
+    async with semaphore:
+        return await asyncio.to_thread(search_unsplash, query, count, orientation)
+
+
+async def _gather(calls, limit: int) -> list:
+    # Semaphores belong to the running loop, so they are made per batch
+    semaphore = asyncio.Semaphore(limit)
+    return await asyncio.gather(
+        *(call(*args, semaphore=semaphore) for call, args in calls),
+        return_exceptions=True
+    )
+
+
+def run_sync(coroutine):
+    """
+    Runs a coroutine to completion from synchronous code such as the
+    Streamlit script thread, which has no event loop of its own. If the
+    caller is already inside a loop, it runs on a separate thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    result = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(coroutine)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def resolve_many(queries: Iterable, require_polygon: bool = False) -> Dict[str, Tuple]:
+    """
+    Resolves many geo_queries concurrently; returns {query: (result, cache_hit)}.
+    A query that raised maps to ({"error": ...}, False), like a failed lookup.
+    """
+    return resolve_groups([(queries, require_polygon)])[0]
+
+
+def resolve_groups(groups: Iterable[Tuple[Iterable, bool]]) -> List[Dict[str, Tuple]]:
+    """
+    resolve_many for several (queries, require_polygon) groups in one
+    concurrent batch, e.g. a map's country outlines, regions and places.
+    """
+    groups = [
+        (list(dict.fromkeys(q for q in queries if q)), require_polygon)
+        for queries, require_polygon in groups
+    ]
+    calls = [
+        (aresolve_geo_query, (query, require_polygon))
+        for queries, require_polygon in groups
+        for query in queries
+    ]
+    results = iter(run_sync(_gather(calls, GEO_CONCURRENCY)) if calls else [])
+    return [
+        {
+            query: (
+                ({"error": str(result)}, False)
+                if isinstance(result, Exception)
+                else result
+            )
+            for query, result in zip(queries, results)
+        }
+        for queries, _ in groups
+    ]
+
+
+def search_unsplash_many(queries: Iterable, count=3) -> Dict[str, List]:
+    """Unsplash photos for many queries concurrently; failed queries are left out."""
+    queries = list(dict.fromkeys(q for q in queries if q))
+    if not queries:
+        return {}
+    calls = [(asearch_unsplash, (query, count)) for query in queries]
+    results = run_sync(_gather(calls, UNSPLASH_CONCURRENCY))
+    return {
+        query: result[0]
+        for query, result in zip(queries, results)
+        if not isinstance(result, Exception)
+    }
@@ -0,0 +1,100 @@
+import threading
+
+import streamlit as st
+
+REGION = "eu-west-1"
+MAX_POOL_CONNECTIONS = 20  # image, geocoding and LLM worker threads share it
+
+_lock = threading.Lock()
+_dynamodb = None
+_tables = {}
+
+
+def get_dynamodb():
+    """
+    The one DynamoDB client for the process, created on first use with
+    credentials from st.secrets. A low-level client, unlike a resource, is
+    safe to share between threads. boto3 itself is only imported then, so
+    importing lib modules doesn't pay for it.
+    """
+    global _dynamodb
+    with _lock:
+        if _dynamodb is None:
+            import boto3
+            from botocore.config import Config
+
+            session = boto3.session.Session(
+                aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
+                aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
+                region_name=REGION,
+            )
+            _dynamodb = session.client(
+                "dynamodb",
+                config=Config(
+                    max_pool_connections=MAX_POOL_CONNECTIONS,
+                    connect_timeout=5,
+                    read_timeout=10,
+                    retries={"max_attempts": 3, "mode": "standard"},
+                ),
+            )
+        return _dynamodb
+
+
+class Table:
+    """
+    The part of boto3's Table API the app uses (get_item, put_item,
+    update_item, query), on the shared client: plain Python values go in
+    and come out, converted the same way a resource would.
+    """
+
+    _ITEM_FIELDS = ("Key", "Item", "ExclusiveStartKey", "ExpressionAttributeValues")
+    _RESULT_FIELDS = ("Item", "Attributes", "LastEvaluatedKey")
+
+    def __init__(self, client, name: str):
+        from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+        self.client = client
+        self.name = name
+        self._serialize = TypeSerializer().serialize
+        self._deserialize = TypeDeserializer().deserialize
+
+    def _call(self, operation: str, params: dict) -> dict:
+        params = dict(params, TableName=self.name)
+        for field in self._ITEM_FIELDS:
+            if field in params:
+                params[field] = self._to_dynamodb(params[field])
+        response = getattr(self.client, operation)(**params)
+        for field in self._RESULT_FIELDS:
+            if field in response:
+                response[field] = self._from_dynamodb(response[field])
+        if "Items" in response:
+            response["Items"] = [self._from_dynamodb(i) for i in response["Items"]]
+        return response
+
+    def _to_dynamodb(self, item: dict) -> dict:
+        return {k: self._serialize(v) for k, v in item.items()}
+
+    def _from_dynamodb(self, item: dict) -> dict:
+        return {k: self._deserialize(v) for k, v in item.items()}
+
+    def get_item(self, **params):
+        return self._call("get_item", params)
+
+    def put_item(self, **params):
+        return self._call("put_item", params)
+
+    def update_item(self, **params):
+        return self._call("update_item", params)
+
+    def query(self, **params):
+        return self._call("query", params)
+
+
+def get_table(name: str) -> Table:
+    """A Table on the shared client; creating one makes no request."""
+    client = get_dynamodb()
+    with _lock:
+        table = _tables.get(name)
+        if table is None:
+            table = _tables[name] = Table(client, name)
+        return table
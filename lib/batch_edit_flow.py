@@ -1,20 +1,30 @@
 import streamlit as st
 import json
-from lib.brainstorm_data import load_brainstorm_data, save_brainstorm_data
+from lib.brainstorm_data import replace_brainstorm_data, upsert_brainstorm_items
 from lib.cache import time_function
+from lib.invalidation import memoize_on_signals
+from lib.llm_provider import generate_entries
+from lib.patch_merge import apply_patches
+from lib.prompt_builder import DEFAULT_TOKEN_BUDGET, build_batches, estimate_tokens
+from lib.rerun_tracker import rerun, tracked_fragment
+from lib.structural_diff import diff_datasets
 from datetime import datetime
-import copy
 
 
 # === Load data and generate prompt ===
-def get_prompt(data):
+def get_prompt(dataset_json, batch_number=1, batch_count=1):
+    batch_note = (
+        f" (batch {batch_number} of {batch_count}; the other batches follow separately)"
+        if batch_count > 1
+        else ""
+    )
     return f"""
 OK.
 
-I currently have the following travel dataset:
+I currently have the following travel dataset{batch_note}:
 
 ```json
-{json.dumps(data, indent=2)}
+{dataset_json}
 ```
 
 Each item includes:
@@ -28,10 +38,11 @@ Each item includes:
   - `access_notes`: how to reach it
   - `seasonal_notes`: includes `best_months`, `avoid_months`, `weather_type`, and `notes`
   - `activities`: list of activity descriptions with seasons
-  - `images`: list of URLs
   - `dependencies`: list of stop IDs to be visited before this one
 - An `annotations` array with travel tips or insights
 
+Image URLs are left out to keep the dataset short; don't add `images` to your suggestions.
+
 ---
 
 Please suggest metadata and annotation improvements using the following JSON format:
@@ -67,78 +78,200 @@ Return **only the enriched JSON array**, nothing else.
 """
 
 
-from datetime import datetime
-import copy
-
-
 def update_last_edited_if_changed(edited_entries, original_entries):
-    original_by_id = {e["id"]: e for e in original_entries if "id" in e}
-    updated = []
+    """
+    Stamps last_edited_timestamp on entries that were added or actually edited.
+    Returns (entries, diff) with the `diff_datasets` report, so callers can
+    show and persist only what changed.
+    """
+    diff = diff_datasets(original_entries, edited_entries)
+    touched = set(diff["added"]) | diff["changed"].keys()
+    now = datetime.now().isoformat()
 
     for entry in edited_entries:
-        entry_id = entry.get("id")
-        old_entry = original_by_id.get(entry_id)
+        if entry.get("id") in touched:
+            entry["last_edited_timestamp"] = now
+
+    return edited_entries, diff
 
-        # Deep copy & strip last_edited_timestamp for comparison
-        old_clean = copy.deepcopy(old_entry) if old_entry else {}
-        new_clean = copy.deepcopy(entry)
 
-        for e in [old_clean, new_clean]:
-            e.pop("last_edited_timestamp", None)
+def get_enrichment_prompts(token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Prompts covering the whole dataset, each within `token_budget`. Cached
+    until the brainstorm data changes, so fragment reruns don't rebuild them.
+    """
 
-        if old_clean != new_clean:
-            entry["last_edited_timestamp"] = datetime.now().isoformat()
+    def build():
+        batches = build_batches(
+            st.session_state.brainstorm_data,
+            token_budget,
+            overhead_tokens=estimate_tokens(get_prompt("")),
+        )
+        return [
+            {
+                "ids": batch["ids"],
+                "prompt": get_prompt(batch["json"], i + 1, len(batches)),
+            }
+            for i, batch in enumerate(batches)
+        ]
 
-        updated.append(entry)
+    return memoize_on_signals(
+        "enrichment_prompts", ["brainstorm_data"], build, extra=token_budget
+    )
 
-    return updated
+
+def apply_and_show_patches(raw, errors=()):
+    """Applies a JSON array of patches and shows what changed or was rejected."""
+    report = apply_patches(st.session_state.brainstorm_data, raw)
+    if report["updated"]:
+        upsert_brainstorm_items(report["updated"])
+    for item_id, changes in report["changes"].items():
+        with st.expander(f"✏️ {item_id}: {len(changes)} changes"):
+            for change in changes:
+                st.markdown(f"- `{change['path']}` → {change['new']}")
+    for error in errors:
+        st.error(f"❌ {error}")
+    for rejected in report["rejected"]:
+        st.error(
+            f"❌ Suggestion {rejected['index'] + 1}"
+            + (f" ({rejected['id']})" if rejected["id"] else "")
+            + ": "
+            + "; ".join(rejected["errors"])
+        )
+    if report["updated"]:
+        st.success(f"✅ Updated {len(report['updated'])} places.")
+    elif not report["rejected"] and not errors:
+        st.info("Nothing to change.")
+
+
+def enrich_in_app(prompts):
+    """
+    Sends every batch prompt to the configured LLM concurrently and applies
+    the suggestions once all of them have streamed in.
+    """
+    raws, errors = [], []
+    total = sum(len(prompt["ids"]) for prompt in prompts)
+    progress = st.progress(0.0, text="Asking the model…")
+    for prompt_index, _, error, raw in generate_entries(p["prompt"] for p in prompts):
+        if error:
+            errors.append(f"Batch {prompt_index + 1}: {error}")
+            continue
+        raws.append(raw)
+        progress.progress(
+            min(len(raws) / total, 1.0), text=f"{len(raws)} suggestions received"
+        )
+    progress.empty()
+    apply_and_show_patches("[" + ",".join(raws) + "]", errors)
 
 
-@st.fragment
+@tracked_fragment
 def batch_enrich_fragment():
-    data = load_brainstorm_data()
     step = st.session_state.get("enrich_step", 0)
     st.markdown("## 🧠 Batch Enrichment Flow")
 
     if step == 1:
         st.markdown("### Step 1/2: Copy this prompt")
-        st.code(get_prompt(data), language="text", height=300)
-        col1, col2 = st.columns([1, 1])
+        token_budget = st.number_input(
+            "Token budget per prompt",
+            min_value=1000,
+            max_value=100_000,
+            value=DEFAULT_TOKEN_BUDGET,
+            step=1000,
+            key="enrich_token_budget",
+        )
+        prompts = get_enrichment_prompts(token_budget)
+        batch = 0
+        if len(prompts) > 1:
+            batch = st.selectbox(
+                "Batch (places missing the most metadata come first)",
+                options=range(len(prompts)),
+                format_func=lambda i: f"{i + 1} of {len(prompts)} · "
+                f"{len(prompts[i]['ids'])} places",
+                key="enrich_batch",
+            )
+        prompt = prompts[batch]["prompt"] if prompts else get_prompt("[]")
+        st.caption(f"≈ {estimate_tokens(prompt)} tokens")
+        st.code(prompt, language="text", height=300)
+        col1, col2, col3 = st.columns([1, 1, 1])
         with col1:
+            enrich = st.button(
+                f"⚡ Enrich all {len(prompts)} batches in app",
+                key="enrich_in_app",
+                disabled=not prompts,
+                help="Uses the configured local LLM instead of copy-pasting to ChatGPT.",
+            )
+        with col2:
             if st.button("Next →", key="enrich_step1_next"):
                 st.session_state.enrich_step = 2
-                st.rerun(scope="fragment")
-        with col2:
+                rerun(scope="fragment")
+        with col3:
             if st.button("Cancel", key="enrich_step1_cancel"):
                 st.session_state.enrich_step = 0
-                st.rerun(scope="app")
+                rerun(scope="app")
+
+        if enrich:
+            enrich_in_app(prompts)
 
     elif step == 2:
-        st.markdown("### Step 2/2: Edit and save enriched dataset")
-        st.info("Manually apply suggestions from ChatGPT below.")
+        st.markdown("### Step 2/2: Apply the suggested changes")
+        st.info(
+            "Paste the JSON array ChatGPT returned; only the places it mentions change."
+        )
 
         raw = st.text_area(
-            "Edit full dataset as JSON array:",
-            value=json.dumps(st.session_state.brainstorm_data, indent=2),
-            height=500,
+            "Paste enrichment suggestions (JSON array):",
+            placeholder='[{"id": "banaue", "metadata": {"score": 0.85}}]',
+            height=300,
+            key="enrich_patch_raw",
         )
-        col1, col2 = st.columns([1, 1])
+        col1, col2, col3 = st.columns([1, 1, 1])
         with col1:
-            if st.button("💾 Save Edits", key="enrich_submit"):
+            if st.button("← Back", key="enrich_step2_back"):
+                st.session_state.enrich_step = 1
+                rerun(scope="fragment")
+        with col2:
+            submitted = st.button("💾 Apply changes", key="enrich_submit")
+        with col3:
+            if st.button("Close", key="enrich_step2_cancel"):
+                st.session_state.enrich_step = 0
+                rerun(scope="app")
+
+        if submitted:
+            apply_and_show_patches(raw)
+
+        # The full-dataset editor dumps everything, so only render it on demand
+        if st.toggle("Edit the full dataset instead", key="enrich_full_edit"):
+            raw_full = st.text_area(
+                "Edit full dataset as JSON array:",
+                value=json.dumps(st.session_state.brainstorm_data, indent=2),
+                height=500,
+            )
+            if st.button("💾 Save Edits", key="enrich_full_submit"):
                 try:
-                    edited_entries = json.loads(raw)
+                    edited_entries = json.loads(raw_full)
                     if not isinstance(edited_entries, list):
                         raise ValueError("Dataset must be a JSON array")
 
-                    updated_entries = update_last_edited_if_changed(
+                    updated_entries, diff = update_last_edited_if_changed(
                         edited_entries, st.session_state.brainstorm_data
                     )
+                    if diff["removed"]:
+                        replace_brainstorm_data(updated_entries)
+                    else:
+                        # Only write back what changed
+                        touched = set(diff["added"]) | diff["changed"].keys()
+                        upsert_brainstorm_items(
+                            [e for e in updated_entries if e.get("id") in touched]
+                        )
 
-                    st.session_state.brainstorm_data = updated_entries
-                    save_brainstorm_data(updated_entries)
-                    st.success("✅ Dataset saved.")
+                    fields = sorted({f for fs in diff["fields"].values() for f in fs})
+                    st.toast(
+                        f"✅ Dataset saved: {len(diff['changed'])} edited"
+                        + (f" ({', '.join(fields)})" if fields else "")
+                        + f", {len(diff['added'])} added, {len(diff['removed'])} removed."
+                    )
                     st.session_state.enrich_step = 0
-                    st.rerun(scope="app")
+                    rerun(scope="app")
 
                 except (json.JSONDecodeError, ValueError) as e:
                     st.error(f"❌ Invalid JSON: {e}")
@@ -1,11 +1,14 @@
 import json
 import streamlit as st
-from lib.db import update_app_data
+from lib.db import cached_snapshot, update_app_data
 
 
 def load_brainstorm_data():
-    data = json.loads(st.session_state.AppUserData.get("brainstorm_data", "[]"))
-    return data
+    # Parsed once per data version and shared with the user's other tabs
+    return cached_snapshot(
+        "brainstorm_data",
+        lambda: json.loads(st.session_state.AppUserData.get("brainstorm_data", "[]")),
+    )
 
 
 def save_brainstorm_data(data):
@@ -18,6 +21,63 @@ def save_brainstorm_data(data):
             ids.add(item["id"])
 
     update_app_data("brainstorm_data", json.dumps(data))
+    cached_snapshot("brainstorm_data", lambda: data)  # spares other tabs the parse
+
+
+# === Indexes ===
+# Derived lookup structures (facets, search, ...) register a factory here. They
+# are built lazily per session and kept in sync by the write helpers below.
+
+INDEXES_KEY = "_brainstorm_indexes"
+_index_factories = {}
+
+
+def register_index(name, factory):
+    """`factory(items)` must return an object with `upsert(item)`."""
+    _index_factories[name] = factory
+
+
+def get_index(name):
+    indexes = st.session_state.setdefault(INDEXES_KEY, {})
+    if name not in indexes:
+        indexes[name] = _index_factories[name](st.session_state.brainstorm_data)
+    return indexes[name]
+
+
+def upsert_brainstorm_items(items, persist=True):
+    """
+    Inserts or replaces items by id, updates built indexes and persists.
+    With persist=False only the session copy changes; save it later with
+    save_brainstorm_data(st.session_state.brainstorm_data).
+    """
+    data = st.session_state.brainstorm_data
+    position = {item["id"]: i for i, item in enumerate(data)}
+    indexes = st.session_state.get(INDEXES_KEY, {}).values()
+
+    for item in items:
+        if item["id"] in position:
+            data[position[item["id"]]] = item
+        else:
+            position[item["id"]] = len(data)
+            data.append(item)
+        for index in indexes:
+            index.upsert(item)
+
+    if persist:
+        save_brainstorm_data(data)
+
+
+def reload_brainstorm_data():
+    """Re-reads the items from AppUserData, e.g. after another tab saved."""
+    st.session_state.brainstorm_data = load_brainstorm_data()
+    st.session_state.pop(INDEXES_KEY, None)
+
+
+def replace_brainstorm_data(data):
+    """Swaps in a whole new dataset; indexes are rebuilt on next access."""
+    st.session_state.brainstorm_data = data
+    st.session_state.pop(INDEXES_KEY, None)
+    save_brainstorm_data(data)
 
 
 brainstorm_item_schema = {
@@ -81,6 +141,17 @@ brainstorm_item_schema = {
                     "type": "array",
                     "items": {"type": "string", "format": "uri"},
                 },
+                "image_variants": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "regular": {"type": "string", "format": "uri"},
+                            "small": {"type": "string", "format": "uri"},
+                            "thumb": {"type": "string", "format": "uri"},
+                        },
+                    },
+                },
                 "dependencies": {"type": "array", "items": {"type": "string"}},
             },
         },
@@ -0,0 +1,184 @@
+import json
+import re
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+from jsonschema import Draft7Validator
+
+from lib.brainstorm_data import brainstorm_item_schema
+
+_STRUCTURAL = re.compile(r'[\[\]{}",]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_ELEMENT_START = re.compile(r"[^\s,]")
+_PREAMBLE = re.compile(r"\s*(?:```[\w-]*\s*)?")  # whitespace, a ```json fence
+
+
+@lru_cache(maxsize=None)
+def get_item_validator() -> Draft7Validator:
+    """The brainstorm item schema, checked and compiled once per process."""
+    Draft7Validator.check_schema(brainstorm_item_schema)
+    return Draft7Validator(brainstorm_item_schema)
+
+
+class JsonArrayStream:
+    """
+    Incremental parser for a JSON array of entries. Text can be fed in chunks
+    (a whole paste, or LLM tokens as they arrive); every top-level element is
+    returned as soon as it is complete, as (index, value, error, raw_text).
+    A malformed element yields an error and parsing continues with the next
+    one. Only whitespace and a ```json fence may precede the opening "[";
+    anything else (e.g. a single pasted object) fails the whole input.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0  # next char to scan
+        self._start = None  # start of the element being scanned
+        self._depth = 0
+        self._in_string = False
+        self._index = 0
+        self.opened = False
+        self.closed = False
+
+    def _emit(self, raw: str):
+        index = self._index
+        self._index += 1
+        self._start = None
+        try:
+            return index, json.loads(raw), None, raw
+        except json.JSONDecodeError as e:
+            return index, None, f"invalid JSON: {e.msg} (near {raw[:40]!r})", raw
+
+    def feed(self, chunk: str) -> List[Tuple]:
+        self._buffer += chunk
+        buf, i, out = self._buffer, self._pos, []
+
+        # Jump between structural characters with regexes instead of looping
+        # over every character in Python.
+        while i < len(buf) and not self.closed:
+            if not self.opened:
+                start = _PREAMBLE.match(buf, i).end()
+                if start == len(buf) or "```".startswith(buf[start:]):
+                    break  # the preamble may continue in the next chunk
+                i = start
+                if buf[i] != "[":
+                    self.closed = True  # not an array; close() reports it
+                    break
+                self.opened = True
+                i += 1
+                continue
+
+            if self._start is None:
+                match = _ELEMENT_START.search(buf, i)
+                if not match:
+                    i = len(buf)
+                    break
+                i = match.start()
+                if buf[i] == "]":
+                    self.closed = True
+                    break
+                self._start = i
+
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buf, i)
+                if not match:
+                    i = len(buf)
+                    break
+                if match.group() == "\\":
+                    i = match.start() + 2  # skip the escaped char, even if not fed yet
+                else:
+                    self._in_string = False
+                    i = match.end()
+                continue
+
+            match = _STRUCTURAL.search(buf, i)
+            if not match:
+                i = len(buf)
+                break
+            c, i = match.group(), match.start()
+            if c == '"':
+                self._in_string = True
+            elif c in "[{":
+                self._depth += 1
+            elif c in "]}":
+                if self._depth == 0:  # closing bracket of the outer array
+                    out.append(self._emit(buf[self._start : i]))
+                    self.closed = True
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    out.append(self._emit(buf[self._start : i + 1]))
+            elif self._depth == 0:  # a comma between elements
+                out.append(self._emit(buf[self._start : i]))
+            i += 1
+
+        # Drop consumed text so long streams don't keep growing the buffer
+        keep_from = min(i, len(buf)) if self._start is None else self._start
+        self._buffer = buf[keep_from:]
+        self._pos = i - keep_from
+        if self._start is not None:
+            self._start = 0
+        return out
+
+    def close(self) -> List[Tuple]:
+        """Flushes whatever is left once the input is complete."""
+        if not self.opened:
+            raw = self._buffer.strip()
+            error = "input must be a JSON array" + (
+                f" (it starts with {raw[0]!r})" if raw else ""
+            )
+            return [(self._index, None, error, raw)]
+        if not self.closed and self._start is not None:
+            raw = self._buffer[self._start :].strip()
+            self._start = None
+            return [(self._index, None, "unterminated entry", raw)]
+        return []
+
+
+def iter_json_array(text: str) -> Iterable[Tuple]:
+    stream = JsonArrayStream()
+    yield from stream.feed(text)
+    yield from stream.close()
+
+
+def entry_errors(entry, existing_ids=()) -> List[str]:
+    """All schema violations of one entry as 'path: message', not just the first."""
+    errors = [
+        f"{'/'.join(str(p) for p in error.absolute_path) or '(entry)'}: {error.message}"
+        for error in sorted(
+            get_item_validator().iter_errors(entry),
+            key=lambda error: [str(p) for p in error.absolute_path],
+        )
+    ]
+    if isinstance(entry, dict) and entry.get("id") in existing_ids:
+        errors.append(f"id: '{entry['id']}' already exists")
+    return errors
+
+
+def validate_entries(text: str, existing_ids=()) -> dict:
+    """
+    Streams the pasted JSON array through the compiled validator.
+
+    Returns {"accepted": [entry, ...], "rejected": [{"index", "id", "errors",
+    "raw"}, ...]} so the valid subset can be saved and every problem shown in
+    one pass.
+    """
+    seen = set(existing_ids)
+    report = {"accepted": [], "rejected": []}
+
+    for index, entry, error, raw in iter_json_array(text):
+        errors = [error] if error else entry_errors(entry, seen)
+        if errors:
+            report["rejected"].append(
+                {
+                    "index": index,
+                    "id": entry.get("id") if isinstance(entry, dict) else None,
+                    "errors": errors,
+                    "raw": raw,
+                }
+            )
+            continue
+        seen.add(entry["id"])
+        report["accepted"].append(entry)
+
+    return report
@@ -1,22 +1,11 @@
-import boto3
 import time
 import json
 import base64
-import streamlit as st
 from typing import Any, List
+from lib.aws import get_table
+from lib.rerun_tracker import record_stage
 
-# Load AWS credentials from Streamlit secrets
-AWS_ACCESS_KEY_ID = st.secrets["AWS_ACCESS_KEY_ID"]
-AWS_SECRET_ACCESS_KEY = st.secrets["AWS_SECRET_ACCESS_KEY"]
-
-dynamo = boto3.resource(
-    "dynamodb",
-    region_name="eu-west-1",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-)
-
-cache_table = dynamo.Table("streamlit-worldtravel-cache")
+CACHE_TABLE = "streamlit-worldtravel-cache"
 
 
 # === Helpers ===
@@ -57,7 +46,7 @@ def query_all_chunks(cache_key: str) -> List[dict]:
         if last_key:
             params["ExclusiveStartKey"] = last_key
 
-        response = cache_table.query(**params)
+        response = get_table(CACHE_TABLE).query(**params)
         all_items.extend(response.get("Items", []))
 
         last_key = response.get("LastEvaluatedKey")
@@ -67,6 +56,33 @@ def query_all_chunks(cache_key: str) -> List[dict]:
     return all_items
 
 
+def get_cached(cache_key: str) -> Any:
+    """The cached value for `cache_key`, or None on a miss. Errors propagate."""
+    items = query_all_chunks(cache_key)
+    if items and all("data" in item for item in items):
+        full_data = "".join(item["data"] for item in items)
+        return deserialize_data(full_data)
+    return None
+
+
+def put_cached(cache_key: str, data: Any, ttl_hours=24):
+    """Stores `data` under `cache_key`, split into chunks if necessary."""
+    current_time = int(time.time())
+    expiration_time = current_time + (ttl_hours * 3600)
+    chunks = chunk_string(serialize_data(data))
+
+    for idx, chunk in enumerate(chunks):
+        get_table(CACHE_TABLE).put_item(
+            Item={
+                "cache_key": cache_key,
+                "chunk_index": idx,
+                "data": chunk,
+                "TTL": expiration_time,
+                "cached_at": current_time,
+            }
+        )
+
+
 # === Caching Decorator ===
 
 
@@ -80,48 +96,29 @@ def cache_response(ttl_hours=24):
 
     def decorator(func):
         def wrapper(*args, **kwargs):
+            # Cache problems fall back to one live call; errors raised by
+            # `func` itself propagate rather than being retried here
             try:
                 cache_key_raw = {"func": func.__name__, "args": args, "kwargs": kwargs}
                 cache_key = serialize_data(cache_key_raw)[:1024]
+                cached_data = get_cached(cache_key)
+            except Exception as e:
+                print(f"Error accessing cache: {e}")
+                return func(*args, **kwargs), False
 
-                current_time = int(time.time())
-                expiration_time = current_time + (ttl_hours * 3600)
-
-                # Try to get all chunks
-                try:
-                    items = query_all_chunks(cache_key)
-                except Exception as e:
-                    print(f"Error accessing cache: {e}")
-                    return func(*args, **kwargs)
-
-                if items and all("data" in item for item in items):
-                    full_data = "".join(item["data"] for item in items)
-                    cached_data = deserialize_data(full_data)
-                    if cached_data is not None:
-                        print("Got cached data from dynamodb")
-                        return cached_data, True
-
-                # Cache miss → compute
-                data = func(*args, **kwargs)
-                serialized_data = serialize_data(data)
-                chunks = chunk_string(serialized_data)
-
-                for idx, chunk in enumerate(chunks):
-                    cache_table.put_item(
-                        Item={
-                            "cache_key": cache_key,
-                            "chunk_index": idx,
-                            "data": chunk,
-                            "TTL": expiration_time,
-                            "cached_at": current_time,
-                        }
-                    )
-                print("Cache miss, but computed data")
-                return data, False
+            if cached_data is not None:
+                print("Got cached data from dynamodb")
+                return cached_data, True
 
+            # Cache miss → compute
+            data = func(*args, **kwargs)
+            try:
+                put_cached(cache_key, data, ttl_hours)
             except Exception as e:
-                print(f"Cache wrapper failed: {e}")
-                return func(*args, **kwargs)
+                print(f"Failed to cache response: {e}")
+            else:
+                print("Cache miss, but computed data")
+            return data, False
 
         return wrapper
 
@@ -134,6 +131,7 @@ def time_function(func):
         result = func(*args, **kwargs)
         end_time = time.time()
         print(f"⏱️ {func.__name__} took {end_time - start_time:.2f} seconds")
+        record_stage(func.__name__, end_time - start_time)
         return result
 
     return wrapper
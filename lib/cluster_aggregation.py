@@ -0,0 +1,251 @@
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from lib.brainstorm_data import get_index, register_index
+from lib.async_clients import resolve_many
+from lib.route_optimizer import haversine_matrix
+
+DBSCAN_EPS_KM = 75.0  # places this close end up in the same inferred cluster
+DBSCAN_MIN_SAMPLES = 2
+INFERRED_PREFIX = "near-"  # inferred cluster ids: "near-<id of the best place>"
+DBSCAN_BLOCK_ROWS = 256  # distance rows computed at once, bounds peak memory
+
+
+def dbscan(coords, eps_km=DBSCAN_EPS_KM, min_samples=DBSCAN_MIN_SAMPLES) -> np.ndarray:
+    """
+    DBSCAN on great-circle distance. Returns a label per (lat, lon) pair:
+    0, 1, ... for clusters and -1 for noise (places with no close neighbours).
+    Distances are computed a block of rows at a time and only the neighbour
+    indices are kept, so memory grows with the neighbours, not n x n.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    n = len(coords)
+    labels = np.full(n, -1)
+    if n == 0:
+        return labels
+    neighbours = []
+    for start in range(0, n, DBSCAN_BLOCK_ROWS):
+        block = haversine_matrix(coords[start : start + DBSCAN_BLOCK_ROWS], coords)
+        neighbours.extend(np.flatnonzero(row) for row in block <= eps_km)
+    core = np.array([len(near) >= min_samples for near in neighbours])
+
+    cluster = 0
+    for seed in np.flatnonzero(core):
+        if labels[seed] != -1:
+            continue
+        labels[seed] = cluster
+        frontier = [seed]
+        while frontier:
+            point = frontier.pop()
+            if not core[point]:
+                continue  # border points join but don't expand the cluster
+            near = neighbours[point]
+            reached = near[labels[near] == -1]
+            labels[reached] = cluster
+            frontier.extend(reached.tolist())
+        cluster += 1
+    return labels
+
+
+def _centroid(coords: np.ndarray) -> List[float]:
+    """Mean position on the sphere, so clusters across the antimeridian work."""
+    lat, lon = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    x = (np.cos(lat) * np.cos(lon)).mean()
+    y = (np.cos(lat) * np.sin(lon)).mean()
+    z = np.sin(lat).mean()
+    return [
+        float(np.degrees(np.arctan2(z, np.hypot(x, y)))),
+        float(np.degrees(np.arctan2(y, x))),
+    ]
+
+
+class ClusterIndex:
+    """
+    Per-cluster summaries (centroid, bbox, count, mean score, total days,
+    budget mix). Items keep their metadata.cluster_id; located items without
+    one are grouped with DBSCAN. An edit only recomputes the clusters the
+    item left and joined, unless an unclustered place moved, which reruns
+    DBSCAN over the unclustered places on next access. Places are geocoded
+    on access too, in one concurrent batch, so edits never wait on Nominatim.
+    """
+
+    def __init__(self):
+        # id -> {geo_query, coords, cluster_id, score, days, budget}
+        self._items: Dict[str, dict] = {}
+        self._inferred: Dict[str, str] = {}  # id -> inferred cluster id
+        self._members: Dict[str, List[str]] = {}
+        self._summaries: Dict[str, dict] = {}
+        self._stale_inference = True
+        self._stale_clusters = set()
+        self._unlocated = set()  # ids whose geo_query hasn't been resolved yet
+
+    @classmethod
+    def from_items(cls, items):
+        index = cls()
+        for item in items:
+            index._items[item["id"]] = cls._record(item)
+            index._unlocated.add(item["id"])
+        return index
+
+    @staticmethod
+    def _record(item: dict) -> dict:
+        meta = item.get("metadata", {})
+        return {
+            "geo_query": item["geo_query"],
+            "coords": None,
+            "cluster_id": meta.get("cluster_id") or None,
+            "score": float(meta.get("score", 0)),
+            "days": float(meta.get("typical_duration_days") or 0),
+            "budget": meta.get("budget_level") or "unknown",
+        }
+
+    def _cluster(self, item_id: str) -> Optional[str]:
+        return self._items[item_id]["cluster_id"] or self._inferred.get(item_id)
+
+    def cluster_of(self, item_id: str) -> Optional[str]:
+        self._refresh()
+        if item_id not in self._items:
+            return None
+        return self._cluster(item_id)
+
+    def upsert(self, item: dict):
+        old = self._items.get(item["id"])
+        new = self._items[item["id"]] = self._record(item)
+        if old is not None and old["geo_query"] == new["geo_query"]:
+            new["coords"] = old["coords"]
+        else:
+            self._unlocated.add(item["id"])
+        if old is not None:
+            self._stale_clusters.add(
+                old["cluster_id"] or self._inferred.get(item["id"])
+            )
+        self._stale_clusters.add(new["cluster_id"])
+
+        # DBSCAN only needs rerunning if the unclustered places moved
+        def free(record):
+            return record["coords"] if record and not record["cluster_id"] else None
+
+        if item["id"] in self._unlocated:
+            # Placed on next access; assume it moved unless it stays clustered
+            moved = not (new["cluster_id"] and (old is None or old["cluster_id"]))
+        else:
+            moved = free(old) != free(new)
+        if moved:
+            self._stale_inference = True
+
+    def _locate(self):
+        if not self._unlocated:
+            return
+        ids = [item_id for item_id in self._unlocated if item_id in self._items]
+        results = resolve_many(self._items[item_id]["geo_query"] for item_id in ids)
+        # Failed lookups (timeouts, rate limits) stay unlocated and are retried
+        # on the next refresh; a query that matched nothing is not
+        self._unlocated = set()
+        for item_id in ids:
+            record = self._items[item_id]
+            result, _ = results[record["geo_query"]]
+            if result and "error" in result:
+                self._unlocated.add(item_id)
+                continue
+            if result:
+                record["coords"] = (result["lat"], result["lon"])
+            if self._stale_clusters is not None:
+                self._stale_clusters.add(record["cluster_id"])
+
+    def _infer(self):
+        ids = [
+            item_id
+            for item_id, record in self._items.items()
+            if not record["cluster_id"] and record["coords"] is not None
+        ]
+        labels = dbscan([self._items[item_id]["coords"] for item_id in ids])
+        groups: Dict[int, List[str]] = {}
+        for item_id, label in zip(ids, labels):
+            if label >= 0:
+                groups.setdefault(int(label), []).append(item_id)
+        self._inferred = {}
+        for group in groups.values():
+            best = max(
+                group, key=lambda item_id: (self._items[item_id]["score"], item_id)
+            )
+            for item_id in group:
+                self._inferred[item_id] = INFERRED_PREFIX + best
+
+    def _refresh(self):
+        self._locate()
+        if self._stale_inference:
+            self._infer()
+            self._stale_inference = False
+            self._stale_clusters = None  # everything
+        if self._stale_clusters is None:
+            self._members = {}
+            for item_id in self._items:
+                cluster = self._cluster(item_id)
+                if cluster:
+                    self._members.setdefault(cluster, []).append(item_id)
+            self._summaries = {
+                cluster: self._summarize(cluster, ids)
+                for cluster, ids in self._members.items()
+            }
+        else:
+            for cluster in self._stale_clusters - {None}:
+                ids = [
+                    item_id
+                    for item_id in self._items
+                    if self._cluster(item_id) == cluster
+                ]
+                if ids:
+                    self._members[cluster] = ids
+                    self._summaries[cluster] = self._summarize(cluster, ids)
+                else:
+                    self._members.pop(cluster, None)
+                    self._summaries.pop(cluster, None)
+        self._stale_clusters = set()
+
+    def _summarize(self, cluster: str, ids: List[str]) -> dict:
+        records = [self._items[item_id] for item_id in ids]
+        located = np.array(
+            [r["coords"] for r in records if r["coords"] is not None]
+        ).reshape(-1, 2)
+        return {
+            "cluster_id": cluster,
+            "inferred": cluster not in {r["cluster_id"] for r in records},
+            "ids": list(ids),
+            "count": len(ids),
+            "centroid": _centroid(located) if len(located) else None,
+            "bbox": (
+                [located.min(axis=0).tolist(), located.max(axis=0).tolist()]
+                if len(located)
+                else None
+            ),
+            "mean_score": float(np.mean([r["score"] for r in records])),
+            "total_days": float(sum(r["days"] for r in records)),
+            "budget_mix": dict(Counter(r["budget"] for r in records)),
+        }
+
+    def summaries(self, ids=None) -> List[dict]:
+        """
+        Cluster summaries, largest first. With `ids` (e.g. the visible ids),
+        clusters are summarized over those members only.
+        """
+        self._refresh()
+        if ids is None:
+            result = list(self._summaries.values())
+        else:
+            result = []
+            for cluster, members in self._members.items():
+                visible = [item_id for item_id in members if item_id in ids]
+                if len(visible) == len(members):
+                    result.append(self._summaries[cluster])
+                elif visible:
+                    result.append(self._summarize(cluster, visible))
+        return sorted(result, key=lambda s: (-s["count"], s["cluster_id"]))
+
+
+register_index("clusters", ClusterIndex.from_items)
+
+
+def get_cluster_index() -> ClusterIndex:
+    return get_index("clusters")
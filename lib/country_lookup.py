@@ -0,0 +1,93 @@
+import json
+import os
+import re
+import unicodedata
+from difflib import get_close_matches
+from functools import lru_cache
+from typing import Dict, Optional
+
+# Built from pycountry by `python scripts/country_codes.py table`
+COUNTRY_TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "static", "countries.json"
+)
+FUZZY_CUTOFF = 0.9  # catches typos like "Phillipines", not different countries
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_name(name: str) -> str:
+    """'Côte d’Ivoire' -> 'cote d ivoire'; 'The Gambia' -> 'gambia'."""
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _NON_WORD.sub(" ", text.casefold().replace("&", " and ")).strip()
+    return text[4:] if text.startswith("the ") else text
+
+
+@lru_cache(maxsize=None)
+def _tables():
+    with open(COUNTRY_TABLE_PATH, encoding="utf-8") as f:
+        countries = json.load(f)
+    by_code, by_name = {}, {}
+    for country in countries:
+        by_code[country["alpha_2"]] = country
+        by_code[country["alpha_3"]] = country
+        for alias in country["aliases"]:
+            by_name.setdefault(normalize_name(alias), country)
+    return by_code, by_name
+
+
+def country_by_code(code: str) -> Optional[Dict]:
+    """Country entry for an ISO 3166-1 alpha-2 or alpha-3 code."""
+    return _tables()[0].get((code or "").strip().upper())
+
+
+def country_by_name(name: str) -> Optional[Dict]:
+    """Country entry for an exact (normalized) name or alias, e.g. 'Vietnam'."""
+    return _tables()[1].get(normalize_name(name))
+
+
+def suggest_country(name: str) -> Optional[Dict]:
+    """Closest country for a misspelled name, if one is close enough."""
+    by_name = _tables()[1]
+    match = get_close_matches(
+        normalize_name(name), by_name.keys(), n=1, cutoff=FUZZY_CUTOFF
+    )
+    return by_name[match[0]] if match else None
+
+
+def prevalidate_location(location: Dict) -> Dict:
+    """
+    Checks a {"country", "country_code", "place"} record against the offline
+    country table, without asking an LLM.
+
+    Returns {"status", "location", "reasons"}:
+      - "valid": country resolved (name and code made consistent, typos
+        corrected) and place set
+      - "ambiguous": needs a model to decide; `reasons` says why
+    """
+    country_name = (location.get("country") or "").strip()
+    code = (location.get("country_code") or "").strip()
+    place = (location.get("place") or "").strip()
+    reasons = []
+
+    by_name = country_by_name(country_name) if country_name else None
+    by_code = country_by_code(code) if code else None
+    if country_name and by_name is None and by_code is None:
+        by_name = suggest_country(country_name)  # a typo, unless a code says otherwise
+
+    if by_name and by_code and by_name is not by_code:
+        reasons.append(f"country '{country_name}' doesn't match code '{code}'")
+    country = by_name or by_code
+    if country is None:
+        if country_name or code:
+            reasons.append(f"unknown country '{country_name or code}'")
+        else:
+            reasons.append("country is empty")
+    if not place:
+        reasons.append("place is empty")
+
+    if reasons:
+        return {"status": "ambiguous", "location": location, "reasons": reasons}
+
+    resolved = dict(location, country=country["name"], country_code=country["alpha_2"])
+    resolved["place"] = place
+    return {"status": "valid", "location": resolved, "reasons": []}
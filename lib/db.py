@@ -1,17 +1,92 @@
+import pickle
+import threading
+import time
+import uuid
 import streamlit as st
 import config_vars
-import boto3
+from lib.aws import get_table
+from lib.invalidation import invalidate
 
-# add authentication from st.secrets
-AWS_ACCESS_KEY_ID = st.secrets["AWS_ACCESS_KEY_ID"]
-AWS_SECRET_ACCESS_KEY = st.secrets["AWS_SECRET_ACCESS_KEY"]
-dynamo = boto3.resource(
-    "dynamodb",
-    region_name="eu-west-1",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-)
-user_data_table = dynamo.Table("streamlit-worldtravel-user-data")
+USER_DATA_TABLE = "streamlit-worldtravel-user-data"
+
+VERSION_KEY = "_app_data_version"  # the stored version this session's data matches
+VERSION_CHECKED_KEY = "_app_data_version_checked"
+VERSION_CHECK_SECONDS = 30
+MAX_CACHED_USERS = 32
+
+# user_id -> (version, {name: pickled value}), shared by all sessions of this
+# server process. A version is a random token written with every save, so a
+# matching token means the snapshot is current. Values are pickled so every
+# session unpickles its own copy to mutate.
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def user_data_table():
+    return get_table(USER_DATA_TABLE)
+
+
+def _user_id():
+    return st.session_state.get("user_id", "Luuk")
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex
+
+
+def remember_snapshot(user_id: str, version: str, name: str, value):
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    with _snapshots_lock:
+        cached = _snapshots.pop(user_id, None)
+        if cached is None or cached[0] != version:
+            cached = (version, {})
+        cached[1][name] = blob
+        _snapshots[user_id] = cached  # most recently used last
+        while len(_snapshots) > MAX_CACHED_USERS:
+            del _snapshots[next(iter(_snapshots))]
+
+
+def get_snapshot(user_id: str, version: str, name: str):
+    """A fresh copy of the cached value, or None if there's none for this version."""
+    with _snapshots_lock:
+        cached = _snapshots.get(user_id)
+        blob = cached[1].get(name) if cached and cached[0] == version else None
+    return pickle.loads(blob) if blob is not None else None
+
+
+def cached_snapshot(name: str, build):
+    """
+    `build()` cached process-wide for the session's user and data version,
+    e.g. the parsed brainstorm_data, so other tabs of the same user reuse it.
+    """
+    version = st.session_state.get(VERSION_KEY)
+    if version is None:
+        return build()
+    value = get_snapshot(_user_id(), version, name)
+    if value is None:
+        value = build()
+        remember_snapshot(_user_id(), version, name, value)
+    return value
+
+
+def stored_version(user_id: str):
+    """The stored data's version, read without the data itself ("" if unversioned)."""
+    response = user_data_table().get_item(
+        Key={"user_id": user_id, "item_id": "AppUserData"},
+        ProjectionExpression="#version",
+        ExpressionAttributeNames={"#version": "version"},
+    )
+    if "Item" not in response:
+        return None
+    return response["Item"].get("version", "")
+
+
+def _saved(version: str, snapshot: bool = True):
+    st.session_state[VERSION_KEY] = version
+    if snapshot:
+        remember_snapshot(
+            _user_id(), version, "AppUserData", st.session_state["AppUserData"]
+        )
 
 
 def update_app_data(key: str, object):
@@ -19,25 +94,121 @@ def update_app_data(key: str, object):
         init_app_data()
 
     st.session_state["AppUserData"][key] = object
-    persist_app_data()
+    persist_app_data_key(key)
+    invalidate(key)
     # st.rerun()
 
 
+def persist_app_data_key(key: str):
+    """
+    Writes only `key` of the user's data, so saving a small change (e.g. one
+    itinerary stop) doesn't re-upload everything else stored next to it.
+    Falls back to a full write when the user has no stored data yet.
+    """
+    user_id = st.session_state.get("user_id", "Luuk")
+    version = _new_version()
+    try:
+        user_data_table().update_item(
+            Key={"user_id": user_id, "item_id": "AppUserData"},
+            UpdateExpression="SET #data.#key = :value, #version = :version",
+            ConditionExpression="attribute_exists(#data)",
+            ExpressionAttributeNames={
+                "#data": "data",
+                "#key": key,
+                "#version": "version",
+            },
+            ExpressionAttributeValues={
+                ":value": st.session_state["AppUserData"][key],
+                ":version": version,
+            },
+        )
+    except user_data_table().client.exceptions.ConditionalCheckFailedException:
+        persist_app_data()
+        return
+    # Only `key` was written: the session's other keys may be older than the
+    # stored ones, so they can't stand in for this version in other tabs
+    _saved(version, snapshot=False)
+    st.toast("✅ Changes saved!")
+
+
 def persist_app_data():
     user_id = st.session_state.get("user_id", "Luuk")
     item_id = "AppUserData"
     data = st.session_state["AppUserData"]
-    user_data_table.put_item(
-        Item={"user_id": user_id, "item_id": item_id, "data": data}
+    version = _new_version()
+    user_data_table().put_item(
+        Item={"user_id": user_id, "item_id": item_id, "data": data, "version": version}
     )
+    _saved(version)
     st.toast("✅ Changes saved!")
 
 
-def init_app_data():
+def init_app_data(version=None):
+    """
+    Loads the user's data into the session. When this process already has a
+    snapshot (e.g. from another tab), only the version is read from DynamoDB
+    (unless the caller just read it) and the data is copied from the
+    snapshot if it is still current.
+    """
     user_id = st.session_state.get("user_id", "Luuk")
     item_id = "AppUserData"
-    response = user_data_table.get_item(Key={"user_id": user_id, "item_id": item_id})
+    st.session_state[VERSION_CHECKED_KEY] = time.time()
+    with _snapshots_lock:
+        cached = _snapshots.get(user_id)
+    if cached is not None:
+        if version is None:
+            version = stored_version(user_id)
+        data = (
+            get_snapshot(user_id, version, "AppUserData")
+            if version is not None
+            else None
+        )
+        if data is not None:
+            st.session_state["AppUserData"] = data
+            st.session_state[VERSION_KEY] = version
+            return
+
+    response = user_data_table().get_item(Key={"user_id": user_id, "item_id": item_id})
     if "Item" in response:
         st.session_state["AppUserData"] = response["Item"]["data"]
+        version = response["Item"].get("version", "")
     else:
         st.session_state["AppUserData"] = {}
+        version = None
+    if version is not None:
+        st.session_state[VERSION_KEY] = version
+        remember_snapshot(
+            user_id, version, "AppUserData", st.session_state["AppUserData"]
+        )
+
+
+def reload_app_data_if_changed(max_age_seconds=VERSION_CHECK_SECONDS) -> bool:
+    """
+    Reloads the session's data if another session saved since it was loaded:
+    right away when that happened in this process, otherwise noticed by a
+    version-only read at most every `max_age_seconds`. Returns True if it did.
+    """
+    version = st.session_state.get(VERSION_KEY)
+    if version is None:
+        return False  # never loaded through init_app_data
+    user_id = _user_id()
+    with _snapshots_lock:
+        cached = _snapshots.get(user_id)
+    latest = None  # unknown until read
+    changed = cached is not None and cached[0] != version
+    if not changed:
+        if time.time() - st.session_state.get(VERSION_CHECKED_KEY, 0) < max_age_seconds:
+            return False
+        st.session_state[VERSION_CHECKED_KEY] = time.time()
+        try:
+            latest = stored_version(user_id)
+        except Exception as e:
+            print(f"Version check failed: {e}")
+            return False
+        changed = latest not in (None, version)
+    if not changed:
+        return False
+
+    init_app_data(latest)
+    invalidate(*st.session_state["AppUserData"].keys())
+    return True
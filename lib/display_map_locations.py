@@ -1,10 +1,15 @@
-import folium
-from folium.plugins import MarkerCluster
 from lib.cache import time_function
+from lib.async_clients import resolve_groups
 from lib.geo_resolver import resolve_geo_query
+from lib.image_cache import local_image_src, prefetch_thumbnails
+from lib.image_fetcher import image_urls
 import streamlit as st
 from datetime import datetime, timedelta
 
+# Above this many visible places, clustered places are drawn as one circle
+# per cluster instead of one marker each
+MAX_PLACE_MARKERS = 300
+
 
 def is_recently_edited(timestamp_str, max_age_minutes=60):
     """Returns True if the given ISO timestamp is within the last `max_age_minutes`."""
@@ -24,10 +29,10 @@ def generate_popup_html(item):
     def fmt_months(months):
         return ", ".join(months) if months else "n/a"
 
-    images = meta.get("images", [])[:2]
+    # Popups show images at 100px, so load the locally cached thumbnail
     image_html = "".join(
-        f'<img src="{url}" style="max-width:100px; height:auto; margin-right:5px;">'
-        for url in images
+        f'<img src="{local_image_src(url)}" style="max-width:100px; height:auto; margin-right:5px;">'
+        for url in image_urls(item, size="thumb", limit=2)
     )
 
     activities = meta.get("activities", [])[:2]
@@ -57,15 +62,73 @@ def generate_popup_html(item):
     """
 
 
+def generate_cluster_popup_html(summary):
+    budget_mix = ", ".join(
+        f"{level}: {count}" for level, count in sorted(summary["budget_mix"].items())
+    )
+    best_month = summary.get("best_month")
+    return f"""
+    <b>{summary['cluster_id']}</b>{' (inferred)' if summary['inferred'] else ''}<br><br>
+    <b>Places:</b> {summary['count']}<br>
+    <b>Mean score:</b> {summary['mean_score']:.2f}<br>
+    <b>Stay:</b> ~{summary['total_days']:g} days in total<br>
+    <b>Budget:</b> {budget_mix}<br>
+    {f"<b>Best month:</b> {best_month}<br>" if best_month else ""}
+    """
+
+
+def add_cluster_layer(map_view, cluster_summaries, show=True):
+    """One circle per cluster at its centroid, sized by the number of places."""
+    import folium
+
+    group = folium.FeatureGroup(name="Cluster summaries", show=show)
+    for summary in cluster_summaries:
+        if summary["centroid"] is None:
+            continue
+        folium.CircleMarker(
+            summary["centroid"],
+            radius=8 + 4 * summary["count"] ** 0.5,
+            color="#1a9850" if summary["mean_score"] >= 0.8 else "#fee08b",
+            weight=2,
+            fill=True,
+            fill_opacity=0.4,
+            popup=folium.Popup(generate_cluster_popup_html(summary), max_width=250),
+        ).add_to(group)
+    group.add_to(map_view)
+
+
+def focus_map_on_item(item, zoom=9):
+    """Selects the item in the edit panel and centers the map on it."""
+    st.session_state.selected_item = item["id"]
+    st.session_state.show_edit_panel = True
+    result, _ = resolve_geo_query(item["geo_query"])
+    if result and "error" not in result:
+        st.session_state.map_focus = {
+            "center": [result["lat"], result["lon"]],
+            "zoom": zoom,
+        }
+
+
 @time_function
 def render_brainstorm_locations(
     brainstorm_data,
-    selected_statuses,
-    selected_countries,
+    visible_ids,
+    facet_index,
+    month_scores=None,
+    cluster_summaries=None,
 ):
     """
     Returns a folium map and debug logs with brainstorm locations rendered.
+    `visible_ids` is the result of `facet_index.select(...)` for the active filters.
+    `month_scores` (id -> suitability for the chosen travel months) colors the
+    places instead of their overall score. `cluster_summaries` (see
+    ClusterIndex.summaries) adds a cluster layer; with more than
+    MAX_PLACE_MARKERS visible places, clustered places are only drawn there.
     """
+    # Imported here so the page can render its controls before folium loads
+    import folium
+    from folium.plugins import MarkerCluster
+
     map_view = folium.Map(
         location=[
             10,
@@ -98,14 +161,37 @@ def render_brainstorm_locations(
     )
 
     # Draw country outlines based on selected filters
-    unique_countries = {
-        item["country"]
-        for item in brainstorm_data
-        if item.get("metadata", {}).get("status") in selected_statuses
-        and item.get("country") in selected_countries
-    }
-    for country in sorted(unique_countries):
-        result, _ = resolve_geo_query(country)
+    unique_countries = [
+        country
+        for country in facet_index.values("country")
+        if not facet_index.ids("country", [country]).isdisjoint(visible_ids)
+    ]
+    # Geocode everything up front and concurrently rather than one by one below
+    visible_items = [item for item in brainstorm_data if item["id"] in visible_ids]
+    country_results, region_results, place_results = resolve_groups(
+        [
+            (unique_countries, True),
+            (
+                [
+                    item["geo_query"]
+                    for item in visible_items
+                    if item.get("location_type") == "region"
+                ],
+                True,
+            ),
+            (
+                [
+                    item["geo_query"]
+                    for item in visible_items
+                    if item.get("location_type") != "region"
+                ],
+                False,
+            ),
+        ]
+    )
+
+    for country in unique_countries:
+        result, _ = country_results[country]
         if result and "geojson" in result:
             folium.GeoJson(
                 result["geojson"],
@@ -120,18 +206,35 @@ def render_brainstorm_locations(
                 },
             ).add_to(country_group)
 
+    # Download missing popup thumbnails in parallel rather than per popup open
+    prefetch_thumbnails(
+        url
+        for item in brainstorm_data
+        if item["id"] in visible_ids
+        for url in image_urls(item, size="thumb", limit=2)
+    )
+
+    summarized = set()
+    if cluster_summaries and len(visible_ids) > MAX_PLACE_MARKERS:
+        summarized = {
+            item_id for summary in cluster_summaries for item_id in summary["ids"]
+        }
+
     # Draw each brainstorm item
     for item in brainstorm_data:
-        if item.get("metadata", {}).get("status") not in selected_statuses:
-            continue
-        if item.get("country") not in selected_countries:
+        if item["id"] not in visible_ids or item["id"] in summarized:
             continue
 
-        result, cache_hit = resolve_geo_query(item["geo_query"])
+        results = (
+            region_results if item.get("location_type") == "region" else place_results
+        )
+        result, cache_hit = results[item["geo_query"]]
         if not result:
             st.toast(f"❌ No results found for query: {item["geo_query"]}")
 
-        debug_logs.append(f"{'✅' if cache_hit else '🆕'} {item['geo_query']}")
+        approximate = result and result.get("approximate")
+        note = " (approximate: enclosing area)" if approximate else ""
+        debug_logs.append(f"{'✅' if cache_hit else '🆕'} {item['geo_query']}{note}")
 
         if result and "error" not in result:
             result["id"] = item["id"]
@@ -141,7 +244,10 @@ def render_brainstorm_locations(
             )
             resolved.append(result)
 
-            score = item.get("metadata", {}).get("score", 0)
+            if month_scores is not None:
+                score = month_scores.get(item["id"], 0)
+            else:
+                score = item.get("metadata", {}).get("score", 0)
             if score >= 0.9:
                 marker_color = "green"
                 fill_color = "#1a9850"  # dark green
@@ -197,6 +303,8 @@ def render_brainstorm_locations(
     region_group.add_to(map_view)
     marker_cluster.add_to(place_group)
     place_group.add_to(map_view)
+    if cluster_summaries:
+        add_cluster_layer(map_view, cluster_summaries, show=bool(summarized))
     st.session_state.feature_group_to_add = place_group  # debug for dynamic maps
     folium.LayerControl(collapsed=False, position="topleft").add_to(map_view)
     st.session_state.debug_logs = st.session_state.get("debug_logs", []) + debug_logs
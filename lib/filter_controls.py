@@ -3,12 +3,21 @@
 import streamlit as st
 from lib.db import update_app_data
 
+# Facets without a filter UI of their own; an empty selection means "all"
+EXTRA_FACETS = {
+    "category": "Category",
+    "budget_level": "Budget",
+    "best_months": "Best months",
+}
 
-def show_filter_controls(data, default_filters):
+
+def show_filter_controls(facet_index, default_filters):
     """
-    Display multiselect filters for statuses and countries and persist selection.
+    Display multiselect filters for statuses, countries and the extra facets
+    and persist selection.
     Returns:
-        tuple: (selected_statuses, selected_countries)
+        dict: facet -> selected values (None = don't filter), ready for
+        `facet_index.select(**filters)`
     """
 
     def persist_filters():
@@ -17,10 +26,14 @@ def show_filter_controls(data, default_filters):
             {
                 "statuses": st.session_state.selected_status_debug,
                 "countries": st.session_state.selected_countries_debug,
+                **{
+                    facet: st.session_state.get(f"selected_{facet}", [])
+                    for facet in EXTRA_FACETS
+                },
             },
         )
 
-    all_countries = sorted(set(item.get("country", "Unknown") for item in data))
+    all_countries = facet_index.values("country")
 
     # st.multiselect(
     #     "Select which statuses to display:",
@@ -44,7 +57,21 @@ def show_filter_controls(data, default_filters):
         on_change=persist_filters,
     )
 
-    return (
-        st.session_state.selected_status_debug,
-        st.session_state.selected_countries_debug,
-    )
+    filters = {
+        "status": st.session_state.selected_status_debug,
+        "country": st.session_state.selected_countries_debug,
+    }
+    with st.expander("More filters", expanded=False):
+        for facet, label in EXTRA_FACETS.items():
+            options = facet_index.values(facet)
+            st.multiselect(
+                label,
+                options=options,
+                default=[v for v in default_filters.get(facet, []) if v in options],
+                placeholder="All",
+                key=f"selected_{facet}",
+                on_change=persist_filters,
+            )
+            filters[facet] = st.session_state[f"selected_{facet}"] or None
+
+    return filters
@@ -0,0 +1,131 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from lib.brainstorm_data import get_index, register_index
+
+MONTH_ORDER = [
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+]
+
+
+def _meta(item):
+    return item.get("metadata", {})
+
+
+def _best_months(item):
+    return _meta(item).get("seasonal_notes", {}).get("best_months", [])
+
+
+# facet name -> function returning the facet values of an item
+FACETS = {
+    "status": lambda item: [_meta(item).get("status")],
+    "country": lambda item: [item.get("country", "Unknown")],
+    "category": lambda item: [item.get("category")],
+    "location_type": lambda item: [item.get("location_type")],
+    "budget_level": lambda item: [_meta(item).get("budget_level")],
+    "best_months": _best_months,
+}
+
+
+def _facet_sort_key(facet: str):
+    if facet == "best_months":
+        return lambda m: (
+            MONTH_ORDER.index(m[:3].title()) if m[:3].title() in MONTH_ORDER else 12,
+            m,
+        )
+    return str
+
+
+class FacetIndex:
+    """
+    Inverted index facet -> value -> item ids, maintained incrementally so
+    filtering is a set intersection instead of a scan over every item.
+    """
+
+    def __init__(self):
+        self._ids = {facet: defaultdict(set) for facet in FACETS}
+        self._values_by_id: Dict[str, Dict[str, tuple]] = {}
+        self._sorted_values: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_items(cls, items: Iterable[dict]) -> "FacetIndex":
+        index = cls()
+        for item in items:
+            index.upsert(item)
+        return index
+
+    def upsert(self, item: dict):
+        item_id = item["id"]
+        self.remove(item_id)
+
+        values = {}
+        for facet, extract in FACETS.items():
+            facet_values = tuple(v for v in extract(item) if v is not None)
+            for value in facet_values:
+                self._ids[facet][value].add(item_id)
+            values[facet] = facet_values
+        self._values_by_id[item_id] = values
+        self._sorted_values.clear()
+
+    def remove(self, item_id: str):
+        old = self._values_by_id.pop(item_id, None)
+        if old is None:
+            return
+        for facet, facet_values in old.items():
+            for value in facet_values:
+                ids = self._ids[facet][value]
+                ids.discard(item_id)
+                if not ids:
+                    del self._ids[facet][value]
+        self._sorted_values.clear()
+
+    @property
+    def all_ids(self) -> Set[str]:
+        return set(self._values_by_id)
+
+    def values(self, facet: str) -> List[str]:
+        """Distinct values of a facet, sorted (months in calendar order)."""
+        if facet not in self._sorted_values:
+            self._sorted_values[facet] = sorted(
+                self._ids[facet], key=_facet_sort_key(facet)
+            )
+        return self._sorted_values[facet]
+
+    def ids(self, facet: str, values: Iterable[str]) -> Set[str]:
+        """Ids of items having any of the given values for a facet."""
+        facet_ids = self._ids[facet]
+        result = set()
+        for value in values:
+            result |= facet_ids.get(value, set())
+        return result
+
+    def select(self, **selections: Optional[Iterable[str]]) -> Set[str]:
+        """
+        Ids matching every given facet selection. A selection of None means
+        "don't filter on this facet"; an empty list matches nothing.
+        """
+        result = None
+        for facet, values in selections.items():
+            if values is None:
+                continue
+            matched = self.ids(facet, values)
+            result = matched if result is None else result & matched
+        return self.all_ids if result is None else result
+
+
+register_index("facets", FacetIndex.from_items)
+
+
+def get_facet_index() -> FacetIndex:
+    return get_index("facets")
@@ -0,0 +1,144 @@
+import mmap
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from lib.country_lookup import country_by_code, country_by_name, normalize_name
+
+# Built from a GeoNames dump by `python scripts/build_gazetteer.py`. Lines are
+# "key\tname\tlat\tlon\tcountry_code\tadmin1\tpopulation", sorted by key and
+# then by population (largest first); the .idx file holds each line's offset
+# as little-endian uint64, so lookups are a binary search over two mmaps.
+GAZETTEER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "static", "gazetteer.tsv"
+)
+INDEX_SUFFIX = ".idx"
+OFFSET_DTYPE = "<u8"  # uint32 would silently wrap past 4 GiB of text
+
+
+class Gazetteer:
+    def __init__(self, path: str = GAZETTEER_PATH):
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = np.memmap(path + INDEX_SUFFIX, dtype=OFFSET_DTYPE, mode="r")
+        if len(self._offsets) and self._offsets[-1] >= len(self._data):
+            raise ValueError(
+                f"{path + INDEX_SUFFIX} doesn't match {path}; "
+                "rebuild it with scripts/build_gazetteer.py"
+            )
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _key_at(self, i: int) -> bytes:
+        start = int(self._offsets[i])
+        return self._data[start : self._data.find(b"\t", start)]
+
+    def _bisect(self, key: bytes) -> int:
+        lo, hi = 0, len(self._offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _row(self, i: int) -> Dict:
+        start = int(self._offsets[i])
+        line = self._data[start : self._data.find(b"\n", start)].decode("utf-8")
+        _, name, lat, lon, country_code, admin1, population = line.split("\t")
+        return {
+            "name": name,
+            "lat": float(lat),
+            "lon": float(lon),
+            "country_code": country_code,
+            "admin1": admin1,
+            "population": int(population or 0),
+        }
+
+    def find(self, name: str) -> List[Dict]:
+        """Places whose name or alternate name normalizes to `name`, largest first."""
+        key = normalize_name(name).encode("utf-8")
+        if not key:
+            return []
+        rows = []
+        i = self._bisect(key)
+        while i < len(self._offsets) and self._key_at(i) == key:
+            rows.append(self._row(i))
+            i += 1
+        return rows
+
+    def find_prefix(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        Places with a name or alternate name starting with `prefix`, largest
+        first, e.g. for search-as-you-type. The matching keys are one
+        contiguous range of the sorted file.
+        """
+        key = normalize_name(prefix).encode("utf-8")
+        if not key:
+            return []
+        # 0xff never occurs in UTF-8, so this sorts after every key with the prefix
+        start, end = self._bisect(key), self._bisect(key + b"\xff")
+        places = {}
+        for i in range(start, end):
+            row = self._row(i)
+            places.setdefault((row["name"], row["lat"], row["lon"]), row)
+        return sorted(places.values(), key=lambda row: -row["population"])[:limit]
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Optional[Gazetteer]:
+    """The local gazetteer, or None if it hasn't been built on this machine."""
+    if not os.path.exists(GAZETTEER_PATH + INDEX_SUFFIX):
+        return None
+    try:
+        return Gazetteer(GAZETTEER_PATH)
+    except ValueError as e:  # e.g. an index from before the uint64 offsets
+        print(f"Local gazetteer disabled: {e}")
+        return None
+
+
+def lookup_place(query: str) -> Optional[Dict]:
+    """
+    Resolves 'Place, Region, Country' to a point from the local gazetteer,
+    in the same shape as resolve_geo_query's results (without geojson).
+
+    Returns None when the gazetteer is missing or the query is ambiguous:
+    several matches and neither the country nor a region part picks one.
+    """
+    gazetteer = get_gazetteer()
+    parts = [part.strip() for part in query.split(",") if part.strip()]
+    if gazetteer is None or not parts:
+        return None
+
+    country = None
+    if len(parts) > 1:
+        country = country_by_name(parts[-1]) or country_by_code(parts[-1])
+        if country:
+            parts = parts[:-1]
+
+    candidates = gazetteer.find(parts[0])
+    if country:
+        candidates = [c for c in candidates if c["country_code"] == country["alpha_2"]]
+    context = {normalize_name(part) for part in parts[1:]}
+    if context:
+        matched = [c for c in candidates if normalize_name(c["admin1"]) in context]
+        candidates = matched or candidates
+    if len(candidates) != 1:
+        return None
+
+    place = candidates[0]
+    country_name = (country or country_by_code(place["country_code"]) or {}).get("name")
+    return {
+        "name": ", ".join(
+            p for p in (place["name"], place["admin1"], country_name) if p
+        ),
+        "lat": place["lat"],
+        "lon": place["lon"],
+        "boundingbox": None,
+        "geojson": None,
+        "source": "gazetteer",
+    }
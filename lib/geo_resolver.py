@@ -1,8 +1,21 @@
-import requests
 from typing import Optional, Dict, List
-import streamlit as st
+import threading
 import time
-from lib.cache import cache_response
+from lib import http_client
+from lib.cache import get_cached, put_cached
+from lib.gazetteer import lookup_place
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_HEADERS = {"User-Agent": "MyTravelApp/1.2 (luuk@luxcloudconsulting.nl)"}
+RESULT_TTL_HOURS = 48
+MISS_TTL_HOURS = 6  # places get added to OSM, and a typo fix changes the query anyway
+VARIANT_PREFIX = "geo:"
+WINNER_PREFIX = "geo-winner:"
+
+# key -> (expires_at, value); saves a DynamoDB read per place on every rerun.
+# Lookups run on worker threads (see async_clients), hence the lock
+_memo: Dict[str, tuple] = {}
+_memo_lock = threading.Lock()
 
 
 def generate_query_variants(query: str) -> List[str]:
@@ -12,6 +25,7 @@ def generate_query_variants(query: str) -> List[str]:
     - 'General Luna, Siargao, Philippines'
     - 'General Luna, Siargao'
     - 'General Luna'
+    - 'Siargao, Philippines' (the enclosing area, shared by nearby places)
     """
     parts = [part.strip() for part in query.split(",")]
     variants = []
@@ -25,15 +39,96 @@ def generate_query_variants(query: str) -> List[str]:
     if parts and parts[0] not in variants:
         variants.append(parts[0])
 
-    return variants
+    return variants + enclosing_areas(query)
+
+
+def enclosing_areas(query: str) -> List[str]:
+    """
+    The areas around the place in a geo_query, e.g. 'Siargao, Philippines'
+    for 'General Luna, Siargao, Philippines'. At least two parts are kept so
+    a lone country doesn't stand in for a place.
+    """
+    parts = [part.strip() for part in query.split(",")]
+    return [", ".join(parts[i:]) for i in range(1, len(parts) - 1)]
 
 
-@st.cache_data(show_spinner=False)
-@cache_response(ttl_hours=48)
-def resolve_geo_query(query: str) -> Optional[Dict]:
+def resolve_geo_query(query: str, require_polygon: bool = False):
+    """
+    Resolves a geo_query string to (result, cache_hit). Point lookups are
+    answered from the local gazetteer when it knows the place; Nominatim is
+    asked for misses and when the caller needs the outline (`require_polygon`,
+    e.g. for countries and regions). Gazetteer results are points only, so
+    cities it knows are drawn as markers without their Nominatim outline.
     """
-    Resolves a geo_query string to lat/lon and geojson data using the Nominatim API.
-    If no result is found, it retries with simplified versions of the query.
+    if not require_polygon:
+        result = lookup_place(query)
+        if result:
+            return result, True
+    return resolve_with_nominatim(query)
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+def _remembered(key: str):
+    """(found, value) from the in-process memo, then DynamoDB."""
+    with _memo_lock:
+        entry = _memo.get(key)
+    if entry is not None and entry[0] > time.time():
+        return True, entry[1]
+    try:
+        cached = get_cached(key)
+    except Exception as e:
+        print(f"Error accessing cache: {e}")
+        return False, None
+    # DynamoDB's TTL deletion can lag by days, so expiry is checked here too
+    if cached is None or cached["expires_at"] <= time.time():
+        return False, None
+    with _memo_lock:
+        _memo[key] = (cached["expires_at"], cached["value"])
+    return True, cached["value"]
+
+
+def _remember(key: str, value, ttl_hours: float):
+    expires_at = time.time() + ttl_hours * 3600
+    with _memo_lock:
+        _memo[key] = (expires_at, value)
+    try:
+        put_cached(key, {"value": value, "expires_at": expires_at}, ttl_hours)
+    except Exception as e:
+        print(f"Failed to cache {key}: {e}")
+
+
+def search_nominatim(query: str) -> Optional[Dict]:
+    """One Nominatim search: the best match, or None. Request errors propagate."""
+    params = {
+        "q": query,
+        "format": "json",
+        "limit": 1,
+        "polygon_geojson": 1,
+    }
+    # http_client spaces requests to Nominatim one second apart, per its policy
+    response = http_client.get(NOMINATIM_URL, params=params, headers=NOMINATIM_HEADERS)
+    response.raise_for_status()
+    results = response.json()
+    if not results:
+        return None
+    result = results[0]
+    return {
+        "name": result.get("display_name"),
+        "lat": float(result["lat"]),
+        "lon": float(result["lon"]),
+        "boundingbox": result.get("boundingbox"),
+        "geojson": result.get("geojson"),
+    }
+
+
+def resolve_with_nominatim(query: str):
+    """
+    Resolves a geo_query string to (result, cache_hit), with lat/lon and
+    geojson from the Nominatim API. If no result is found, it retries with
+    simplified versions of the query.
 
     Example:
       query = 'General Luna, Siargao, Philippines'
@@ -41,37 +136,48 @@ def resolve_geo_query(query: str) -> Optional[Dict]:
         - 'General Luna, Siargao, Philippines'
         - 'General Luna, Siargao'
         - 'General Luna'
+        - 'Siargao, Philippines'
+
+    Every variant's outcome is cached on its own, so variants like
+    'Siargao, Philippines' are shared between queries, and misses are cached
+    for MISS_TTL_HOURS so failing queries don't search again on every rerun.
+    The variant that worked is remembered per query and tried first next
+    time, unless a more specific variant failed with a request error rather
+    than a definite miss. A request error skips to the next variant (and
+    isn't cached); the errors are only returned if no variant resolved.
+    Results for an enclosing area are marked `approximate`, since they put
+    the place at the area's centre.
     """
-    NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
-    headers = {"User-Agent": "MyTravelApp/1.2 (luuk@luxcloudconsulting.nl)"}
-
-    queries_to_try = generate_query_variants(query)
-
-    for attempt_query in queries_to_try:
-        params = {
-            "q": attempt_query,
-            "format": "json",
-            "limit": 1,
-            "polygon_geojson": 1,
-        }
-
-        try:
-            response = requests.get(NOMINATIM_URL, params=params, headers=headers)
-            time.sleep(1.0)
-            response.raise_for_status()
-            results = response.json()
-
-            if results:
-                result = results[0]
-                return {
-                    "name": result.get("display_name"),
-                    "lat": float(result["lat"]),
-                    "lon": float(result["lon"]),
-                    "boundingbox": result.get("boundingbox"),
-                    "geojson": result.get("geojson"),
-                }
-
-        except Exception as e:
-            return {"error": str(e)}
-
-    return None
+    variants = generate_query_variants(query)
+    enclosing = set(enclosing_areas(query))
+    _, winner = _remembered(WINNER_PREFIX + _normalize(query))
+    if winner in variants:
+        variants.remove(winner)
+        variants.insert(0, winner)
+
+    searched = False
+    errors = []
+    for variant in variants:
+        key = VARIANT_PREFIX + _normalize(variant)
+        found, result = _remembered(key)
+        if not found:
+            try:
+                result = search_nominatim(variant)
+            except Exception as e:
+                errors.append(f"{variant}: {e}")
+                continue
+            searched = True
+            _remember(key, result, RESULT_TTL_HOURS if result else MISS_TTL_HOURS)
+
+        if result:
+            # After an error the specific variant may still exist; don't pin
+            # the query to a fallback for RESULT_TTL_HOURS
+            if variant != winner and not errors:
+                _remember(WINNER_PREFIX + _normalize(query), variant, RESULT_TTL_HOURS)
+            if variant in enclosing:
+                result = dict(result, approximate=True)
+            return result, not searched
+
+    if errors:
+        return {"error": "; ".join(errors)}, False
+    return None, not searched
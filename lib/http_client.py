@@ -0,0 +1,154 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = (5, 20)  # (connect, read) seconds
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # seconds; doubles per attempt, with full jitter
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_SIZE = 10  # connections kept per host, enough for the thumbnail prefetch
+
+# Minimum seconds between requests to a host, per their usage policies
+HOST_MIN_INTERVAL = {
+    "nominatim.openstreetmap.org": 1.0,
+    "overpass-api.de": 1.0,
+}
+
+_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+_next_slot: Dict[str, float] = {}  # host -> earliest time the next request may start
+_metrics: Dict[str, dict] = {}
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def get_session(url: str) -> requests.Session:
+    """One pooled session per host, so repeated calls reuse TCP/TLS connections."""
+    host = _host(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def _wait_for_slot(host: str):
+    interval = HOST_MIN_INTERVAL.get(host)
+    if not interval:
+        return
+    with _lock:
+        now = time.monotonic()
+        start = max(now, _next_slot.get(host, 0.0))
+        _next_slot[host] = start + interval
+    if start > now:
+        time.sleep(start - now)
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Retry-After as seconds (it can be a number or an HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(
+    attempt: int, response: Optional[requests.Response] = None
+) -> float:
+    retry_after = retry_after_seconds(response) if response is not None else None
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def _record(host: str, seconds: float, status: Optional[int], retried: bool):
+    with _lock:
+        stats = _metrics.setdefault(
+            host,
+            {"requests": 0, "errors": 0, "retries": 0, "latencies": deque(maxlen=500)},
+        )
+        stats["requests"] += 1
+        stats["retries"] += retried
+        if status is None or status >= 400:
+            stats["errors"] += 1
+        stats["latencies"].append(seconds)
+
+
+def request(
+    method: str, url: str, retries: int = MAX_RETRIES, **kwargs
+) -> requests.Response:
+    """
+    `requests.request` through the host's pooled session, with a default
+    timeout, the host's rate limit, and retries on connection errors and
+    RETRY_STATUSES (waiting Retry-After if given, else exponential backoff
+    with jitter). The last response is returned as is, so callers still
+    call raise_for_status(); the last connection error is raised.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    host = _host(url)
+    session = get_session(url)
+    for attempt in range(retries + 1):
+        _wait_for_slot(host)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            _record(host, time.perf_counter() - started, None, attempt > 0)
+            if attempt == retries:
+                raise
+            time.sleep(backoff_seconds(attempt))
+            continue
+
+        _record(host, time.perf_counter() - started, response.status_code, attempt > 0)
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        response.close()
+        time.sleep(backoff_seconds(attempt, response))
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def get_metrics() -> list:
+    """Per-host request counts and latencies (over the last 500 requests)."""
+    rows = []
+    with _lock:
+        for host, stats in sorted(_metrics.items()):
+            latencies = sorted(stats["latencies"])
+            rows.append(
+                {
+                    "host": host,
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "retries": stats["retries"],
+                    "p50 (ms)": round(latencies[len(latencies) // 2] * 1000, 1),
+                    "p95 (ms)": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+                }
+            )
+    return rows
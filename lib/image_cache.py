@@ -0,0 +1,123 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from lib import http_client
+
+# Thumbnails live under ./static so Streamlit serves them at /app/static/...
+# (server.enableStaticServing in .streamlit/config.toml)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "thumbs")
+STATIC_URL_PREFIX = "/app/static/thumbs"
+THUMB_SIZE = (200, 150)
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+MAX_FETCH_WORKERS = 6
+
+_lock = threading.Lock()
+_total_bytes = None  # lazily measured, then kept up to date on write/evict
+
+
+def _path_for(url: str, size=THUMB_SIZE) -> str:
+    key = hashlib.sha1(f"{url}|{size[0]}x{size[1]}".encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.jpg")
+
+
+def _cache_size() -> int:
+    global _total_bytes
+    if _total_bytes is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _total_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(CACHE_DIR) if entry.is_file()
+        )
+    return _total_bytes
+
+
+def _evict(max_bytes: int):
+    """Drops least recently used thumbnails (by mtime) until under `max_bytes`."""
+    global _total_bytes
+    entries = sorted(
+        (entry for entry in os.scandir(CACHE_DIR) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in entries:
+        if _total_bytes <= max_bytes:
+            break
+        size = entry.stat().st_size
+        try:
+            os.remove(entry.path)
+            _total_bytes -= size
+        except FileNotFoundError:
+            pass
+
+
+def make_thumbnail(image_bytes: bytes, size=THUMB_SIZE) -> bytes:
+    """Center-cropped, fixed-size JPEG thumbnail."""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        thumb = ImageOps.fit(image.convert("RGB"), size, Image.LANCZOS)
+    out = io.BytesIO()
+    thumb.save(out, format="JPEG", quality=80, optimize=True)
+    return out.getvalue()
+
+
+def get_thumbnail(url: str, size=THUMB_SIZE, fetch=None, max_bytes=MAX_CACHE_BYTES):
+    """
+    Returns the local path of the thumbnail for `url`, downloading the source
+    once and caching the result on disk. `fetch(url) -> bytes` can be swapped
+    for tests or a stub server. Returns None if the image can't be fetched.
+    """
+    global _total_bytes
+    path = _path_for(url, size)
+    if os.path.exists(path):
+        os.utime(path)  # mark as recently used
+        return path
+
+    try:
+        if fetch is None:
+            response = http_client.get(url)
+            response.raise_for_status()
+            data = make_thumbnail(response.content, size)
+        else:
+            data = make_thumbnail(fetch(url), size)
+    except Exception as e:
+        print(f"⚠️ Failed to cache image {url}: {e}")
+        return None
+
+    with _lock:
+        _cache_size()
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        _total_bytes += len(data)
+        if _total_bytes > max_bytes:
+            _evict(max_bytes)
+    return path
+
+
+def prefetch_thumbnails(urls, size=THUMB_SIZE, fetch=None):
+    """Fills the cache for all missing urls concurrently."""
+    missing = [url for url in set(urls) if not os.path.exists(_path_for(url, size))]
+    if not missing:
+        return
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as pool:
+        list(pool.map(lambda url: get_thumbnail(url, size, fetch), missing))
+
+
+def local_image_src(url: str, size=THUMB_SIZE, inline=False) -> str:
+    """
+    Where a popup should load `url` from: the static URL (or an inline data
+    URI) of the cached thumbnail, or the remote url if it isn't cached yet.
+    Never blocks on the network; use `prefetch_thumbnails` for that.
+    """
+    path = _path_for(url, size)
+    if not os.path.exists(path):
+        return url
+    if inline:
+        with open(path, "rb") as f:
+            encoded = base64.b64encode(f.read()).decode("ascii")
+        return f"data:image/jpeg;base64,{encoded}"
+    return f"{STATIC_URL_PREFIX}/{os.path.basename(path)}"
@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+
+from lib.brainstorm_data import save_brainstorm_data, upsert_brainstorm_items
+from lib.image_fetcher import search_unsplash, set_item_images
+from lib.rerun_tracker import rerun, tracked_fragment
+
+JOB_KEY = "image_enrichment_job"
+SAVE_EVERY = 10  # applied items between saves while the job runs
+
+
+def _rate_limited(error: Exception) -> bool:
+    """Unsplash answers 429, or 403 with no quota left, once the hourly limit is used."""
+    if not isinstance(error, requests.HTTPError) or error.response is None:
+        return False
+    response = error.response
+    if response.status_code == 429:
+        return True
+    return (
+        response.status_code == 403
+        and response.headers.get("X-Ratelimit-Remaining") == "0"
+    )
+
+
+class ImageEnrichmentJob:
+    """
+    Fetches images for items without any, on a bounded worker pool.
+
+    Workers never touch Streamlit: they only append to `results`/`errors`
+    under a lock. The script thread drains those into the session with
+    `drain()`. Pacing follows Unsplash's X-Ratelimit-Remaining header; when
+    the quota drops to `reserve` the job pauses and can be resumed later with
+    the same pending queue.
+    """
+
+    def __init__(self, items, max_workers=3, reserve=2, slow_below=10):
+        self.pending = deque(
+            (
+                item["id"],
+                item.get("image_query") or item.get("name") or item.get("geo_query"),
+            )
+            for item in items
+            if not item.get("metadata", {}).get("images")
+        )
+        self.total = len(self.pending)
+        self.max_workers = max_workers
+        self.reserve = reserve
+        self.slow_below = slow_below
+        self.remaining = None  # last seen X-Ratelimit-Remaining
+        self.results = {}  # item_id -> photos, not yet applied to the session
+        self.errors = {}  # item_id -> error message
+        self.done = 0
+        self.unsaved = 0  # items applied to the session but not saved yet
+        self.paused_reason = None
+        self._lock = threading.Lock()
+        self._executor = None
+        self._active = 0
+
+    @property
+    def running(self) -> bool:
+        with self._lock:
+            return self._active > 0
+
+    def start(self):
+        if self.running or not self.pending:
+            return
+        self.paused_reason = None
+        self.remaining = None  # the window may have reset; the next call tells
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="image-enrichment"
+        )
+        with self._lock:
+            workers = self._active = min(self.max_workers, len(self.pending))
+        for _ in range(workers):
+            self._executor.submit(self._work)
+        self._executor.shutdown(wait=False)
+
+    def pause(self, reason="paused"):
+        self.paused_reason = reason
+
+    def _next(self):
+        with self._lock:
+            if self.paused_reason or not self.pending:
+                return None
+            if self.remaining is not None and self.remaining <= self.reserve:
+                self.paused_reason = "Unsplash rate limit reached, resume later"
+                return None
+            return self.pending.popleft()
+
+    def _pace(self):
+        """Spread the last few requests of the window out instead of bursting."""
+        if self.remaining is not None and self.remaining < self.slow_below:
+            time.sleep((self.slow_below - self.remaining) * 0.5)
+
+    def _work(self):
+        try:
+            while (task := self._next()) is not None:
+                item_id, query = task
+                try:
+                    photos, remaining = search_unsplash(query)
+                    with self._lock:
+                        self.results[item_id] = photos
+                        if remaining is not None:
+                            self.remaining = remaining
+                except Exception as e:
+                    with self._lock:
+                        if _rate_limited(e):
+                            self.paused_reason = "Unsplash rate limit reached"
+                            self.pending.append(task)  # retry on resume
+                            continue
+                        self.errors[item_id] = str(e)
+                with self._lock:
+                    self.done += 1
+                self._pace()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def drain(self) -> dict:
+        """Takes the finished results; call from the Streamlit script thread."""
+        with self._lock:
+            results, self.results = self.results, {}
+        return results
+
+
+def start_image_enrichment(data):
+    job = st.session_state.get(JOB_KEY)
+    if job is None or not (job.running or job.pending):
+        job = ImageEnrichmentJob(data)
+        if not job.total:
+            st.toast("✅ All places already have images.")
+            return
+        st.session_state[JOB_KEY] = job
+    job.start()
+
+
+def _apply_results(job):
+    """
+    Applies finished results to the session and indexes every tick, but only
+    saves every SAVE_EVERY items and once the job stops (paused or done).
+    """
+    results = job.drain()
+    by_id = {item["id"]: item for item in st.session_state.brainstorm_data}
+    updated = []
+    for item_id, photos in results.items():
+        item = by_id.get(item_id)
+        if item is not None:
+            set_item_images(item, photos)
+            updated.append(item)
+    if updated:
+        upsert_brainstorm_items(updated, persist=False)
+        job.unsaved += len(updated)
+    if job.unsaved and (job.unsaved >= SAVE_EVERY or not job.running):
+        save_brainstorm_data(st.session_state.brainstorm_data)
+        job.unsaved = 0
+
+
+def _show_progress(job):
+    _apply_results(job)
+    st.progress(
+        min(job.done / job.total, 1.0),
+        text=f"🖼️ Images: {job.done}/{job.total}"
+        + (f" · {job.remaining} API calls left" if job.remaining is not None else ""),
+    )
+    if job.errors:
+        st.caption(f"⚠️ {len(job.errors)} lookups failed")
+
+    if job.running:
+        if st.button("⏸ Pause", key="pause_image_enrichment"):
+            job.pause()
+    elif job.pending:
+        st.caption(job.paused_reason or "Paused")
+        if st.button("▶️ Resume", key="resume_image_enrichment"):
+            job.start()
+            rerun(scope="app")  # back to the polling fragment
+    else:
+        # Finished: rebuild the map once so popups show the new images
+        _apply_results(job)  # results stored after the drain above
+        del st.session_state[JOB_KEY]
+        st.toast("✅ Image enrichment completed.")
+        rerun(scope="app")
+
+
+@tracked_fragment(run_every=1.5)
+def _image_enrichment_progress_fragment():
+    job = st.session_state[JOB_KEY]
+    _show_progress(job)
+    if not job.running and job.pending:
+        rerun(scope="app")  # paused: swap in the fragment that doesn't poll
+
+
+@tracked_fragment
+def _image_enrichment_paused_fragment():
+    _show_progress(st.session_state[JOB_KEY])
+
+
+def maybe_show_image_enrichment_progress():
+    # Only poll while workers are running; a paused job just waits for Resume
+    job = st.session_state.get(JOB_KEY)
+    if job is None:
+        return
+    if job.running:
+        _image_enrichment_progress_fragment()
+    else:
+        _image_enrichment_paused_fragment()
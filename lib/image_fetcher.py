@@ -1,55 +1,78 @@
-import time
-import requests
-import threading
+import re
+
 import streamlit as st
 
-from lib.brainstorm_data import save_brainstorm_data
+from lib import http_client
+from lib.cache import cache_response
 
-# Load your Unsplash API key from Streamlit secrets
-UNSPLASH_ACCESS_KEY = st.secrets["UNSPLASH_ACCESS_KEY"]
 UNSPLASH_API_URL = "https://api.unsplash.com/search/photos"
+IMAGE_SIZES = ("regular", "small", "thumb")
 
+# Width per size for Unsplash URLs stored before variants were kept
+_DERIVED_WIDTHS = {"small": 400, "thumb": 200}
 
-def fetch_unsplash_images(query, count=3):
+
+@cache_response(ttl_hours=24 * 7)
+def _search_unsplash_cached(query, count, orientation):
     params = {
         "query": query,
-        "client_id": UNSPLASH_ACCESS_KEY,
+        "client_id": st.secrets["UNSPLASH_ACCESS_KEY"],  # read on first use, not import
         "per_page": count,
-        "orientation": "landscape",
+        "orientation": orientation,
     }
-    response = requests.get(UNSPLASH_API_URL, params=params)
+    response = http_client.get(UNSPLASH_API_URL, params=params)
     response.raise_for_status()
-    results = response.json().get("results", [])
-    st.toast(f"📷 Fetched {len(results)} images for {query}")
-    return [img["urls"]["regular"] for img in results]
+    remaining = response.headers.get("X-Ratelimit-Remaining")
+    return {
+        "photos": [
+            {size: img["urls"][size] for size in IMAGE_SIZES}
+            for img in response.json().get("results", [])
+        ],
+        "remaining": int(remaining) if remaining is not None else None,
+    }
+
 
+def search_unsplash(query, count=3, orientation="landscape"):
+    """
+    Unsplash search through the DynamoDB cache, keyed by (query, count,
+    orientation). No Streamlit calls, so it is safe to run from worker threads.
 
-def enrich_items_with_images(data):
-    max_enrichments = 5
-    for item in data:
-        meta = item.get("metadata", {})
-        if "images" in meta and meta["images"]:
-            continue  # Already enriched
+    Returns (photos, remaining) where each photo has the `regular`, `small` and
+    `thumb` URLs, and `remaining` is X-Ratelimit-Remaining after a live call
+    (None on a cache hit, which costs no quota).
+    """
+    query = " ".join(query.lower().split())
+    result, cache_hit = _search_unsplash_cached(query, count, orientation)
+    return result["photos"], None if cache_hit else result["remaining"]
 
-        if max_enrichments <= 0:
-            break
 
-        query = item.get("name") or item.get("geo_query")
-        print(f"🔍 Searching images for: {query}")
-        try:
-            urls = fetch_unsplash_images(query)
-            meta["images"] = urls if urls else []
-            max_enrichments -= 1
-        except Exception as e:
-            print(f"⚠️ Failed to fetch images for {query}: {e}")
-            meta["images"] = []
+def fetch_unsplash_images(query, count=3):
+    photos, _ = search_unsplash(query, count)
+    st.toast(f"📷 Fetched {len(photos)} images for {query}")
+    return photos
 
-        time.sleep(1)  # Respect Unsplash rate limit (50 req/hr on free tier)
 
-    st.toast("✅ Image enrichment completed.")
-    save_brainstorm_data(data)
+def set_item_images(item, photos):
+    """Stores full-size URLs in `images` and all sizes in `image_variants`."""
+    meta = item.setdefault("metadata", {})
+    meta["images"] = [photo["regular"] for photo in photos]
+    meta["image_variants"] = photos
 
 
-def enrich_items_with_images_threaded(data):
-    thread = threading.Thread(target=enrich_items_with_images, args=(data,))
-    thread.start()
+def image_urls(item, size="thumb", limit=None):
+    """
+    URLs of the item's images at the requested size. Falls back to resizing
+    Unsplash URLs via their `w` parameter for items saved without variants.
+    """
+    meta = item.get("metadata", {})
+    images = meta.get("images", [])[:limit]
+    variants = meta.get("image_variants", [])
+    urls = []
+    for i, url in enumerate(images):
+        if i < len(variants) and variants[i].get(size):
+            urls.append(variants[i][size])
+        elif size in _DERIVED_WIDTHS and "images.unsplash.com" in url:
+            urls.append(re.sub(r"([?&])w=\d+", rf"\g<1>w={_DERIVED_WIDTHS[size]}", url))
+        else:
+            urls.append(url)
+    return urls
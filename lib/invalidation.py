@@ -0,0 +1,37 @@
+import streamlit as st
+
+VERSIONS_KEY = "_invalidation_versions"
+MEMO_KEY = "_invalidation_memo"
+
+
+def get_version(signal: str) -> int:
+    """Returns the current version of an invalidation signal (0 if never bumped)."""
+    return st.session_state.get(VERSIONS_KEY, {}).get(signal, 0)
+
+
+def invalidate(*signals: str):
+    """
+    Bumps the version of each signal so every part of the page that depends on
+    it rebuilds on its next run. Signals are named after the AppUserData key
+    they guard, e.g. "brainstorm_data", "itinerary_data", "brainstorm_filters".
+    """
+    versions = st.session_state.setdefault(VERSIONS_KEY, {})
+    for signal in signals:
+        versions[signal] = versions.get(signal, 0) + 1
+
+
+def memoize_on_signals(name: str, signals, build, extra=None):
+    """
+    Returns the result of `build()`, rebuilding only when one of `signals` was
+    invalidated or `extra` (any hashable, e.g. the active filters) changed.
+    The result lives in session_state, so it survives app-scope reruns.
+    """
+    signature = (tuple(get_version(s) for s in signals), extra)
+    memo = st.session_state.setdefault(MEMO_KEY, {})
+    cached = memo.get(name)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    result = build()
+    memo[name] = (signature, result)
+    return result
@@ -0,0 +1,164 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import streamlit as st
+
+from lib.db import update_app_data
+from lib.geo_resolver import resolve_geo_query
+from lib.route_optimizer import haversine_matrix, optimize_route, route_length
+
+ITINERARY_KEY = "_itinerary"
+_MAX = "\U0010ffff"  # sorts after any date/timestamp/id string
+
+
+class Itinerary:
+    """
+    Itinerary entries indexed by id and kept in target_date order as they
+    change (undated entries first, like before), so rendering doesn't re-sort
+    and add/move/delete don't rebuild the list. `entries()` keeps the order
+    entries were first added in, which is what gets persisted.
+    """
+
+    def __init__(self, entries=()):
+        self._by_id: Dict[str, dict] = {}
+        self._order: List[tuple] = []  # sorted (target_date, added_timestamp, id)
+        self.source = None  # the persisted list this was built from / saved as
+        for entry in entries:
+            self._by_id[entry["id"]] = entry
+        self._order = sorted(self._key(entry) for entry in self._by_id.values())
+
+    @staticmethod
+    def _key(entry: dict) -> tuple:
+        return (
+            entry.get("target_date") or "",
+            entry.get("added_timestamp") or "",
+            entry["id"],
+        )
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, entry_id):
+        return entry_id in self._by_id
+
+    def __iter__(self) -> Iterator[dict]:
+        """Entries by target_date."""
+        return (self._by_id[key[2]] for key in self._order)
+
+    def get(self, entry_id: str) -> Optional[dict]:
+        return self._by_id.get(entry_id)
+
+    def entries(self) -> List[dict]:
+        """Entries in the order they were first added."""
+        return list(self._by_id.values())
+
+    def _unlink(self, entry: dict):
+        key = self._key(entry)
+        i = bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+
+    def add(self, entry: dict):
+        """Adds an entry, or replaces the one with the same id in place."""
+        old = self._by_id.get(entry["id"])
+        if old is not None:
+            self._unlink(old)
+        self._by_id[entry["id"]] = entry
+        insort(self._order, self._key(entry))
+
+    def move(self, entry_id: str, target_date: Optional[str]) -> dict:
+        """Gives an entry a new target_date (ISO string or None)."""
+        old = self._by_id[entry_id]
+        self.add(dict(old, target_date=target_date))
+        return self._by_id[entry_id]
+
+    def delete(self, entry_id: str) -> Optional[dict]:
+        entry = self._by_id.pop(entry_id, None)
+        if entry is not None:
+            self._unlink(entry)
+        return entry
+
+    def between(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[dict]:
+        """Dated entries with start <= target_date <= end (ISO strings, inclusive)."""
+        lo = bisect_left(self._order, (start or "\x00",))
+        hi = bisect_right(self._order, (end + _MAX,)) if end else len(self._order)
+        return [self._by_id[key[2]] for key in self._order[lo:hi]]
+
+
+def get_itinerary() -> Itinerary:
+    """
+    The session's Itinerary, rebuilt only when the stored itinerary_data was
+    replaced by something other than `save_itinerary` (e.g. a reload).
+    """
+    raw = st.session_state.get("AppUserData", {}).get("itinerary_data") or []
+    itinerary = st.session_state.get(ITINERARY_KEY)
+    if itinerary is None or itinerary.source is not raw:
+        itinerary = Itinerary(raw)
+        itinerary.source = raw
+        st.session_state[ITINERARY_KEY] = itinerary
+    return itinerary
+
+
+def save_itinerary(itinerary: Itinerary):
+    """Persists only the itinerary_data key (see update_app_data)."""
+    entries = itinerary.entries()
+    itinerary.source = entries
+    update_app_data("itinerary_data", entries)
+
+
+def plan_route(itinerary: Itinerary, brainstorm_data, time_budget=1.0) -> Dict:
+    """
+    Suggests a stop order for the itinerary: shortest route over the resolved
+    places, respecting metadata.dependencies and keeping cluster_ids together.
+    Stops that can't be located go last, in their current order.
+
+    Returns {"ids": [...], "distance_km", "current_distance_km", "unresolved": [...]}.
+    """
+    items = {item["id"]: item for item in brainstorm_data}
+    located, coords, unresolved = [], [], []
+    for entry in itinerary:
+        item = items.get(entry["id"])
+        result = resolve_geo_query(item["geo_query"])[0] if item else None
+        if result and "error" not in result:
+            located.append(entry["id"])
+            coords.append((result["lat"], result["lon"]))
+        else:
+            unresolved.append(entry["id"])
+
+    index = {entry_id: i for i, entry_id in enumerate(located)}
+    metadata = [items[entry_id].get("metadata", {}) for entry_id in located]
+    dependencies = [
+        [index[dep] for dep in meta.get("dependencies", []) if dep in index]
+        for meta in metadata
+    ]
+    clusters = [meta.get("cluster_id") for meta in metadata]
+
+    route = optimize_route(coords, dependencies, clusters, time_budget=time_budget)
+    current = (
+        route_length(haversine_matrix(coords), range(len(coords))) if coords else 0.0
+    )
+    return {
+        "ids": [located[i] for i in route["order"]] + unresolved,
+        "distance_km": route["distance_km"],
+        "current_distance_km": current,
+        "unresolved": unresolved,
+    }
+
+
+def schedule_route(itinerary: Itinerary, ids: List[str], start: date, brainstorm_data):
+    """
+    Gives the stops consecutive target dates in the order of `ids`, each
+    staying its duration_hint (or the place's typical_duration_days) days.
+    """
+    durations = {
+        item["id"]: item.get("metadata", {}).get("typical_duration_days")
+        for item in brainstorm_data
+    }
+    day = start
+    for entry_id in ids:
+        entry = itinerary.move(entry_id, day.isoformat())
+        days = entry.get("duration_hint") or durations.get(entry_id) or 1
+        day += timedelta(days=int(days))
@@ -1,24 +1,70 @@
 import streamlit as st
 from datetime import datetime
-from lib.db import update_app_data
+from lib.itinerary import get_itinerary, plan_route, save_itinerary, schedule_route
+from lib.rerun_tracker import rerun, tracked_fragment
 
 
-@st.fragment
+def show_route_planner(itinerary):
+    with st.container(border=True):
+        st.markdown("#### 🧭 Optimize route")
+        if st.button("Suggest the shortest stop order", key="optimize_route"):
+            with st.spinner("Optimizing route…"):
+                st.session_state.route_plan = plan_route(
+                    itinerary, st.session_state.get("brainstorm_data", [])
+                )
+
+        plan = st.session_state.get("route_plan")
+        if not plan:
+            return
+        st.markdown(
+            f"**{plan['distance_km']:,.0f} km** in this order "
+            f"(now {plan['current_distance_km']:,.0f} km)"
+        )
+        st.markdown(
+            "\n".join(
+                f"{i + 1}. {itinerary.get(entry_id)['name']}"
+                for i, entry_id in enumerate(plan["ids"])
+                if entry_id in itinerary
+            )
+        )
+        if plan["unresolved"]:
+            st.caption(
+                f"Couldn't locate {len(plan['unresolved'])} stops; they go last."
+            )
+
+        start = st.date_input("First day", value=datetime.today(), key="route_start")
+        if st.button("📅 Reschedule in this order", key="apply_route"):
+            ids = [entry_id for entry_id in plan["ids"] if entry_id in itinerary]
+            schedule_route(
+                itinerary, ids, start, st.session_state.get("brainstorm_data", [])
+            )
+            save_itinerary(itinerary)
+            st.session_state.route_plan = None
+            rerun(scope="fragment")
+
+
+@tracked_fragment
 def render_itinerary_overview():
-    itinerary = st.session_state.get("AppUserData", {}).get("itinerary_data")
+    itinerary = get_itinerary()
 
     st.markdown("## 🧭 Your Itinerary")
     if not itinerary:
         st.info("No items in your itinerary yet.")
         return
 
-    # Sort by target_date if available, otherwise fallback to name
-    itinerary_sorted = sorted(
-        itinerary,
-        key=lambda x: x.get("target_date") or "",
+    show_route_planner(itinerary)
+
+    # Entries are kept in target_date order, so there's nothing to sort here
+    entries = iter(itinerary)
+    date_range = st.date_input(
+        "Only show stops between", value=(), key="itinerary_range"
     )
+    if len(date_range) == 2:
+        entries = itinerary.between(
+            date_range[0].isoformat(), date_range[1].isoformat()
+        )
 
-    for idx, item in enumerate(itinerary_sorted):
+    for item in entries:
         with st.container():
             st.markdown(f"### 📍 {item['name']}")
 
@@ -37,10 +83,24 @@ def render_itinerary_overview():
                     st.markdown(f"📅 **{target_date}**")
                 if item.get("duration_hint"):
                     st.markdown(f"⏱️ {item['duration_hint']} days")
+                with st.popover("📅 Move"):
+                    new_date = st.date_input(
+                        "New target date",
+                        value=(
+                            datetime.fromisoformat(item["target_date"])
+                            if item.get("target_date")
+                            else datetime.today()
+                        ),
+                        key=f"move_date_{item['id']}",
+                    )
+                    if st.button("Move", key=f"move_{item['id']}"):
+                        itinerary.move(item["id"], new_date.isoformat())
+                        save_itinerary(itinerary)
+                        rerun(scope="fragment")
 
-            if st.button("Delete entry"):
-                itinerary_sorted.pop(idx)
-                update_app_data("itinerary_data", itinerary_sorted)
-                st.rerun(scope="fragment")
+            if st.button("Delete entry", key=f"delete_{item['id']}"):
+                itinerary.delete(item["id"])
+                save_itinerary(itinerary)
+                rerun(scope="fragment")
 
             st.divider()
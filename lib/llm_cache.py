@@ -0,0 +1,125 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional, Tuple
+
+from lib.cache import get_cached, put_cached
+
+# LLM responses are by far the slowest thing the app waits on, so they are
+# kept in two tiers: this process (instant) and the DynamoDB cache table
+# (shared across sessions and deploys).
+MAX_LOCAL_ENTRIES = 512
+REMOTE_TTL_HOURS = 24 * 30
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+_inflight = {}  # key -> Future of the request currently computing it
+_inflight_lock = threading.Lock()
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalize_prompt(text: str) -> str:
+    """Drops indentation and trailing/blank-line noise that doesn't change the request."""
+    lines = (line.strip() for line in (text or "").strip().splitlines())
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines))
+
+
+def llm_cache_key(
+    model: str, prompt: str, system: Optional[str] = None, **params
+) -> str:
+    """Hash of (model, prompt, system prompt, params), insensitive to formatting."""
+    key = {
+        "model": model,
+        "prompt": normalize_prompt(prompt),
+        "system": normalize_prompt(system) if system else None,
+        "params": {k: v for k, v in params.items() if v is not None},
+    }
+    encoded = json.dumps(key, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return "llm:" + hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def get_completion(key: str) -> Optional[str]:
+    """The cached response for `key` from the local tier, then DynamoDB."""
+    with _local_lock:
+        if key in _local:
+            _local.move_to_end(key)
+            return _local[key]
+
+    try:
+        text = get_cached(key)
+    except Exception as e:
+        print(f"Error accessing cache: {e}")
+        return None
+    if text is not None:
+        _remember(key, text)
+    return text
+
+
+def put_completion(key: str, text: str):
+    _remember(key, text)
+    try:
+        put_cached(key, text, REMOTE_TTL_HOURS)
+    except Exception as e:
+        print(f"Failed to cache LLM response: {e}")
+
+
+def _remember(key: str, text: str):
+    with _local_lock:
+        _local[key] = text
+        _local.move_to_end(key)
+        while len(_local) > MAX_LOCAL_ENTRIES:
+            _local.popitem(last=False)
+
+
+def claim(key: str) -> Tuple[Future, bool]:
+    """
+    Deduplicates concurrent identical requests. Returns (future, owner): the
+    owner computes the response and must call `release`; everyone else waits
+    on `future.result()`.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = Future()
+        _inflight[key] = future
+        return future, True
+
+
+def release(key: str, future: Future, text: Optional[str] = None, error=None):
+    """Stores the owner's result (unless it failed) and wakes up any waiters."""
+    if error is None:
+        put_completion(key, text)
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    if error is None:
+        future.set_result(text)
+    else:
+        future.set_exception(error)
+
+
+def cached_completion(
+    model: str, prompt: str, compute: Callable[[], str], system=None, **params
+) -> Tuple[str, bool]:
+    """
+    Returns (response, was_cached), calling `compute()` only when no tier has
+    the response and no identical request is already in flight.
+    """
+    key = llm_cache_key(model, prompt, system, **params)
+    text = get_completion(key)
+    if text is not None:
+        return text, True
+
+    future, owner = claim(key)
+    if not owner:
+        return future.result(), True
+    try:
+        text = compute()
+    except Exception as e:
+        release(key, future, error=e)
+        raise
+    release(key, future, text)
+    return text, False
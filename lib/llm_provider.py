@@ -0,0 +1,190 @@
+import json
+import queue
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+import streamlit as st
+
+from lib import http_client
+from lib.bulk_validation import JsonArrayStream
+from lib.llm_cache import claim, get_completion, llm_cache_key, release
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+DEFAULT_MODEL = "mistral"
+MAX_CONCURRENCY = 3  # a local model serves few requests at a time anyway
+SYSTEM_PROMPT = (
+    "You are a helpful assistant. ONLY return valid JSON. DO NOT add any commentary, "
+    "notes, or explanation before or after. Output ONLY the JSON array as a raw value."
+)
+
+
+class LLMProvider(ABC):
+    """
+    Interface for text generation backends. Subclasses implement `stream`,
+    which yields the response text in chunks as the model produces it.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+
+    @classmethod
+    def from_secrets(cls, model: str) -> "LLMProvider":
+        """The provider with any backend-specific settings taken from st.secrets."""
+        return cls(model)
+
+    @abstractmethod
+    def stream(
+        self, prompt: str, system: Optional[str] = None, **params
+    ) -> Iterator[str]:
+        """Yields the response text in chunks."""
+
+    def complete(self, prompt: str, system: Optional[str] = None, **params) -> str:
+        return "".join(self.stream(prompt, system, **params))
+
+
+class OllamaProvider(LLMProvider):
+    """Ollama's /api/generate endpoint (or scripts/stub_server.py, which mimics it)."""
+
+    name = "ollama"
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        base_url: str = DEFAULT_OLLAMA_URL,
+        timeout=300,
+    ):
+        super().__init__(model)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    @classmethod
+    def from_secrets(cls, model):
+        return cls(model, st.secrets.get("OLLAMA_URL", DEFAULT_OLLAMA_URL))
+
+    def stream(self, prompt, system=None, **params):
+        body = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": params,
+        }
+        if system:
+            body["system"] = system
+        with http_client.post(
+            f"{self.base_url}/api/generate",
+            json=body,
+            stream=True,
+            timeout=(5, self.timeout),
+        ) as response:
+            response.raise_for_status()
+            # One JSON object per line: {"response": "<token>", "done": false}
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+
+
+PROVIDERS = {"ollama": OllamaProvider}
+
+
+def get_provider() -> LLMProvider:
+    """The provider configured in secrets (LLM_PROVIDER, LLM_MODEL, OLLAMA_URL)."""
+    name = st.secrets.get("LLM_PROVIDER", "ollama")
+    model = st.secrets.get("LLM_MODEL", DEFAULT_MODEL)
+    return PROVIDERS[name].from_secrets(model)
+
+
+def stream_response(provider: LLMProvider, prompt: str, system=SYSTEM_PROMPT, **params):
+    """
+    Streams a response. Cached responses (see lib/llm_cache.py) come back in
+    one chunk; an identical request already in flight is waited on instead of
+    being sent twice.
+    """
+    key = llm_cache_key(f"{provider.name}:{provider.model}", prompt, system, **params)
+    cached = get_completion(key)
+    if cached is not None:
+        yield cached
+        return
+
+    future, owner = claim(key)
+    if not owner:
+        yield future.result()
+        return
+
+    chunks = []
+    # Waiters must be woken however this ends, including when the consumer
+    # closes the generator early; a partial response is never cached
+    error = RuntimeError("the response stream was closed before it finished")
+    try:
+        for chunk in provider.stream(prompt, system, **params):
+            chunks.append(chunk)
+            yield chunk
+        error = None
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if error is None:
+            release(key, future, "".join(chunks))
+        else:
+            release(key, future, error=error)
+
+
+# === Batched generation ===
+
+
+def generate_entries(prompts, provider=None, max_concurrency=MAX_CONCURRENCY, **params):
+    """
+    Runs `prompts` concurrently (at most `max_concurrency` in flight) and
+    parses each response as a JSON array while it streams in.
+
+    Yields (prompt_index, entry, error, raw) as soon as each array element is
+    complete; a failed request yields one (prompt_index, None, error, "").
+    Must be consumed on the script thread: workers only put results on a
+    queue and never touch Streamlit.
+    """
+    prompts = list(prompts)
+    provider = provider or get_provider()
+    results = queue.Queue()
+    finished = object()
+
+    def work(prompt_index, prompt):
+        parser = JsonArrayStream()
+        try:
+            for chunk in stream_response(provider, prompt, **params):
+                for _, entry, error, raw in parser.feed(chunk):
+                    results.put((prompt_index, entry, error, raw))
+            for _, entry, error, raw in parser.close():
+                results.put((prompt_index, entry, error, raw))
+        except Exception as e:
+            results.put(
+                (prompt_index, None, f"{provider.name} request failed: {e}", "")
+            )
+        finally:
+            results.put(finished)
+
+    pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+    try:
+        for prompt_index, prompt in enumerate(prompts):
+            pool.submit(work, prompt_index, prompt)
+
+        pending = len(prompts)
+        while pending:
+            result = results.get()
+            if result is finished:
+                pending -= 1
+            else:
+                yield result
+    finally:
+        # If the consumer stops early (e.g. a rerun), don't block on the
+        # requests still streaming; queued prompts are dropped
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,113 @@
+from datetime import datetime
+from typing import List, Tuple
+
+from lib.bulk_validation import entry_errors, iter_json_array
+
+# Lists whose entries carry their own id and are merged entry by entry
+KEYED_LISTS = {"annotations"}
+_MISSING = object()
+
+
+def _merge_value(old, new, path, changes):
+    if isinstance(old, dict) and isinstance(new, dict):
+        return _merge_dict(old, new, path, changes)
+    if path in KEYED_LISTS and isinstance(old, list) and isinstance(new, list):
+        return _merge_keyed_list(old, new, path, changes)
+    if old is _MISSING or old != new:
+        changes.append(
+            {"path": path, "old": None if old is _MISSING else old, "new": new}
+        )
+        return new
+    return old
+
+
+def _merge_dict(old: dict, patch: dict, path: str, changes) -> dict:
+    """Copy-on-write merge: returns `old` itself when the patch changes nothing."""
+    merged = None
+    for key, new in patch.items():
+        before = len(changes)
+        value = _merge_value(
+            old.get(key, _MISSING), new, f"{path}.{key}" if path else key, changes
+        )
+        if len(changes) > before:
+            if merged is None:
+                merged = dict(old)
+            merged[key] = value
+    return old if merged is None else merged
+
+
+def _merge_keyed_list(old: list, patch: list, path: str, changes) -> list:
+    """Replaces entries with a matching id and appends new ones."""
+    merged = list(old)
+    position = {
+        entry["id"]: i
+        for i, entry in enumerate(old)
+        if isinstance(entry, dict) and entry.get("id") is not None
+    }
+    for entry in patch:
+        entry_id = entry.get("id") if isinstance(entry, dict) else None
+        # Entries without an id are always new, never a match for each other
+        i = position.get(entry_id) if entry_id is not None else None
+        if i is None:
+            changes.append({"path": f"{path}[{entry_id}]", "old": None, "new": entry})
+            merged.append(entry)
+        elif merged[i] != entry:
+            changes.append(
+                {"path": f"{path}[{entry_id}]", "old": merged[i], "new": entry}
+            )
+            merged[i] = entry
+    return merged if len(merged) != len(old) or merged != old else old
+
+
+def merge_patch(item: dict, patch: dict) -> Tuple[dict, List[dict]]:
+    """
+    Deep-merges a partial item (the shape the enrichment prompt asks for) into
+    `item` without mutating it. Returns (merged_item, changes) where each
+    change is {"path", "old", "new"}; merged_item is `item` if nothing changed.
+    """
+    changes = []
+    merged = _merge_dict(
+        item, {k: v for k, v in patch.items() if k != "id"}, "", changes
+    )
+    return merged, changes
+
+
+def apply_patches(items, text: str) -> dict:
+    """
+    Parses a JSON array of patches and merges each into the item with the same
+    id. Only items that actually change are returned in "updated" (stamped
+    with last_edited_timestamp); merges that introduce schema errors are
+    rejected.
+
+    Returns {"updated": [...], "changes": {id: [...]}, "rejected": [{"index",
+    "id", "errors"}]}.
+    """
+    by_id = {item["id"]: item for item in items}
+    report = {"updated": [], "changes": {}, "rejected": []}
+
+    for index, patch, error, _ in iter_json_array(text):
+        patch_id = patch.get("id") if isinstance(patch, dict) else None
+        if error or patch_id is None:
+            errors = [error or "patch must be an object with an id"]
+        elif patch_id not in by_id:
+            errors = [f"id: unknown place '{patch_id}'"]
+        else:
+            merged, changes = merge_patch(by_id[patch_id], patch)
+            # Only blame the patch for problems it introduced; older items may
+            # predate parts of the schema (e.g. image_query)
+            errors = []
+            if changes:
+                existing = entry_errors(by_id[patch_id])
+                errors = [e for e in entry_errors(merged) if e not in existing]
+            if changes and not errors:
+                merged["last_edited_timestamp"] = datetime.now().isoformat()
+                by_id[patch_id] = merged  # later patches for the same id build on it
+                report["changes"].setdefault(patch_id, []).extend(changes)
+
+        if errors:
+            report["rejected"].append(
+                {"index": index, "id": patch_id, "errors": errors}
+            )
+
+    report["updated"] = [by_id[item_id] for item_id in report["changes"]]
+    return report
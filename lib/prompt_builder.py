@@ -0,0 +1,91 @@
+import json
+import math
+from typing import List
+
+# Metadata the enrichment LLM doesn't need (URLs are long and never enriched)
+EXCLUDED_METADATA = {"images", "image_variants"}
+PROMPT_FIELDS = [
+    "id",
+    "name",
+    "geo_query",
+    "country",
+    "location_type",
+    "category",
+    "metadata",
+    "annotations",
+]
+# Optional metadata an item should have after enrichment
+ENRICHABLE_METADATA = [
+    "flexibility_rank",
+    "cluster_id",
+    "typical_duration_days",
+    "budget_level",
+    "access_notes",
+    "activities",
+    "seasonal_notes",
+]
+DEFAULT_TOKEN_BUDGET = 6000
+CHARS_PER_TOKEN = 4  # rough average for English/JSON with GPT-style tokenizers
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def project_item(item: dict) -> dict:
+    """The subset of an item the LLM needs, without image URLs."""
+    projected = {field: item[field] for field in PROMPT_FIELDS if field in item}
+    if "metadata" in projected:
+        projected["metadata"] = {
+            k: v for k, v in item["metadata"].items() if k not in EXCLUDED_METADATA
+        }
+    return projected
+
+
+def missing_metadata_count(item: dict) -> int:
+    meta = item.get("metadata", {})
+    missing = sum(1 for field in ENRICHABLE_METADATA if not meta.get(field))
+    return missing + (0 if item.get("annotations") else 1)
+
+
+def compact_json(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def build_batches(
+    items, token_budget=DEFAULT_TOKEN_BUDGET, overhead_tokens=0
+) -> List[dict]:
+    """
+    Splits items into batches whose compact JSON fits `token_budget` minus the
+    prompt's own `overhead_tokens`. Items missing the most metadata come first,
+    so the first batches are the most useful to enrich. An item larger than
+    the budget gets a batch of its own.
+
+    Returns [{"ids": [...], "json": "[...]", "tokens": n}, ...]
+    """
+    available = max(token_budget - overhead_tokens, 1)
+    ranked = sorted(items, key=missing_metadata_count, reverse=True)
+
+    batches, current, current_tokens = [], [], 0
+    for item in ranked:
+        encoded = compact_json(project_item(item))
+        tokens = estimate_tokens(encoded) + 1  # +1 for the separating comma
+        if current and current_tokens + tokens > available:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((item["id"], encoded))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+
+    result = []
+    for batch in batches:
+        batch_json = "[" + ",".join(encoded for _, encoded in batch) + "]"
+        result.append(
+            {
+                "ids": [item_id for item_id, _ in batch],
+                "json": batch_json,
+                "tokens": estimate_tokens(batch_json),
+            }
+        )
+    return result
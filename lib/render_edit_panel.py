@@ -1,10 +1,12 @@
 import streamlit as st
 import json
-from lib.brainstorm_data import save_brainstorm_data
+from lib.brainstorm_data import replace_brainstorm_data, upsert_brainstorm_items
 from lib.cache import time_function
-from lib.image_fetcher import fetch_unsplash_images
+from lib.image_fetcher import fetch_unsplash_images, set_item_images
 from datetime import datetime
 from lib.add_to_itinerary import show_add_to_itinerary_dialog
+from lib.rerun_tracker import rerun
+from lib.structural_diff import changed_fields, fields_edited_in_place, get_hash_index
 
 
 def show_editable_item(item):
@@ -26,6 +28,9 @@ def show_editable_item(item):
                 item["annotations"] = [
                     {"id": f"a{i+1}", "text": line} for i, line in enumerate(lines)
                 ]
+                if not fields_edited_in_place(item):
+                    st.info("Nothing changed.")
+                    return None
                 item["last_edited_timestamp"] = datetime.now().isoformat()
 
                 return item
@@ -40,15 +45,15 @@ def show_editable_item(item):
             if st.button("🔄 Renew Images", use_container_width=True):
                 try:
                     query = item.get("image_query", "question mark")
-                    urls = fetch_unsplash_images(query)
-                    item.setdefault("metadata", {})["images"] = urls if urls else []
-                    st.toast(f"✅ Refreshed {len(urls)} images.")
+                    photos = fetch_unsplash_images(query)
+                    set_item_images(item, photos)
+                    st.toast(f"✅ Refreshed {len(photos)} images.")
                     return item  # Re-save with new images
                 except Exception as e:
                     st.error(f"Failed to fetch images: {e}")
             if st.button("⚙️ Advanced Modify", use_container_width=True):
                 st.session_state.advanced_edit = True
-                st.rerun()
+                rerun(scope="fragment")
     else:
         st.markdown("### ⚙️ Advanced JSON Editor")
         raw_item = {k: v for k, v in item.items() if k != "last_edited_timestamp"}
@@ -60,6 +65,9 @@ def show_editable_item(item):
             if st.button("💾 Save Advanced"):
                 try:
                     updated = json.loads(raw_json)
+                    if not changed_fields(item, updated):
+                        st.info("Nothing changed.")
+                        return None
                     st.session_state.advanced_edit = False
                     updated["last_edited_timestamp"] = datetime.now().isoformat()
                     return updated
@@ -69,25 +77,36 @@ def show_editable_item(item):
         with col2:
             if st.button("⬅️ Back to Simple Edit"):
                 st.session_state.advanced_edit = False
-                st.rerun()
+                rerun(scope="fragment")
 
     return None
 
 
 @time_function
-@st.fragment
 def render_edit_panel(brainstorm_data, clicked_id):
+    """
+    Renders the editor for the clicked item. Called from the edit panel
+    fragment; a save invalidates "brainstorm_data" (via upsert_brainstorm_items)
+    and reruns the app so the map picks up the new popup content.
+    """
     selected_id = clicked_id
     if selected_id:
         item = next((x for x in brainstorm_data if x["id"] == selected_id), None)
         if item:
+            get_hash_index()  # snapshot the saved items before any in-place edit
             updated = show_editable_item(item)
             if updated:
-                for i, it in enumerate(st.session_state.brainstorm_data):
-                    if it["id"] == selected_id:
-                        st.session_state.brainstorm_data[i] = updated
-                        save_brainstorm_data(st.session_state.brainstorm_data)
-                        break
+                if updated.get("id") != selected_id:  # renamed in the JSON editor
+                    replace_brainstorm_data(
+                        [
+                            updated if x["id"] == selected_id else x
+                            for x in brainstorm_data
+                        ]
+                    )
+                    st.session_state.selected_item = updated.get("id")
+                else:
+                    upsert_brainstorm_items([updated])
+                rerun(scope="app")
 
 
 def maybe_show_raw_edit():
@@ -98,8 +117,7 @@ def maybe_show_raw_edit():
     )
     if st.button("💾 Save Batch Edit"):
         try:
-            st.session_state.brainstorm_data = json.loads(raw)
-            save_brainstorm_data(st.session_state.brainstorm_data)
+            replace_brainstorm_data(json.loads(raw))
             st.success("✅ Entire dataset saved.")
         except json.JSONDecodeError as e:
             st.error(f"Invalid JSON: {e}")
@@ -0,0 +1,184 @@
+import functools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+RUNS_KEY = "_rerun_log"
+CURRENT_KEY = "_rerun_current"
+PENDING_TRIGGER_KEY = "_rerun_pending_trigger"
+WIDGET_SNAPSHOT_KEY = "_rerun_widget_snapshot"
+MAX_RUNS = 200
+# Button-like widgets hold a value only in the run they were clicked in
+TRIGGER_DEFAULTS = {"trigger_value": False, "string_trigger_value": None}
+
+
+# === Helpers ===
+
+
+def _is_fragment_run() -> bool:
+    """True when Streamlit is rerunning only fragments, not the whole page."""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+
+def _changed_widget_keys() -> list:
+    """Keyed widgets whose value differs from what they held after the last run."""
+    snapshot = st.session_state.get(WIDGET_SNAPSHOT_KEY, {})
+    changed = []
+    for key, old_value in snapshot.items():
+        if key in st.session_state and st.session_state[key] != old_value:
+            changed.append(key)
+    return changed
+
+
+def _value_type(ctx, key: str):
+    """The widget's value type, from Streamlit internals (None if those change)."""
+    try:
+        state = ctx.session_state._state
+        metadata = state._new_widget_state.widget_metadata.get(
+            state._get_widget_id(key)
+        )
+    except AttributeError:
+        return None
+    return metadata and metadata.value_type
+
+
+def _snapshot_widgets():
+    ctx = get_script_run_ctx()
+    if not ctx:
+        return
+    snapshot = st.session_state.setdefault(WIDGET_SNAPSHOT_KEY, {})
+    for key in ctx.widget_user_keys_this_run:
+        if key in st.session_state:
+            # A button is back to its default next run; only a click is a change
+            value_type = _value_type(ctx, key)
+            if value_type in TRIGGER_DEFAULTS:
+                snapshot[key] = TRIGGER_DEFAULTS[value_type]
+            else:
+                snapshot[key] = st.session_state[key]
+
+
+# === Recording ===
+
+
+def start_run(scope: str = "app"):
+    """
+    Opens a record for the current run. Call it at the top of the page for app
+    runs; fragments decorated with `tracked_fragment` open their own.
+    """
+    if st.session_state.get(CURRENT_KEY):
+        # The previous run never reached finish_run (st.stop or an exception)
+        finish_run(status="interrupted")
+
+    pending = st.session_state.pop(PENDING_TRIGGER_KEY, None)
+    st.session_state[CURRENT_KEY] = {
+        "started_at": datetime.now().isoformat(timespec="milliseconds"),
+        "scope": scope,
+        "trigger": pending or ", ".join(_changed_widget_keys()) or "page load",
+        "stages": {},
+        "_t0": time.perf_counter(),
+    }
+
+
+def record_stage(name: str, seconds: float):
+    """Attributes an expensive stage (anything wrapped in time_function) to the run."""
+    if get_script_run_ctx() is None:
+        return  # called from a worker thread, no session to record into
+    current = st.session_state.get(CURRENT_KEY)
+    if current is not None:
+        current["stages"][name] = current["stages"].get(name, 0.0) + seconds
+
+
+def finish_run(status: str = "completed"):
+    current = st.session_state.pop(CURRENT_KEY, None)
+    if current is None:
+        return
+
+    duration = time.perf_counter() - current.pop("_t0")
+    current["duration_s"] = round(duration, 4)
+    current["status"] = status
+    current["stages"] = {k: round(v, 4) for k, v in current["stages"].items()}
+
+    runs = st.session_state.setdefault(RUNS_KEY, [])
+    runs.append(current)
+    del runs[:-MAX_RUNS]
+    _snapshot_widgets()
+
+
+def rerun(scope: str = "app"):
+    """
+    Drop-in replacement for st.rerun that remembers its call site, so the next
+    run is attributed to the code that requested it.
+    """
+    caller = sys._getframe(1)
+    st.session_state[PENDING_TRIGGER_KEY] = (
+        f"st.rerun({scope}) @ {os.path.basename(caller.f_code.co_filename)}:"
+        f"{caller.f_lineno} {caller.f_code.co_name}"
+    )
+    finish_run(status="rerun requested")
+    st.rerun(scope=scope)
+
+
+def tracked_fragment(func=None, *, run_every=None):
+    """st.fragment that records its own fragment-scoped reruns."""
+    if func is None:
+        return functools.partial(tracked_fragment, run_every=run_every)
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        if not _is_fragment_run():
+            return func(*args, **kwargs)  # part of an app run, already recorded
+
+        start_run(scope=f"fragment:{func.__name__}")
+        try:
+            return func(*args, **kwargs)
+        finally:
+            finish_run()
+
+    return st.fragment(run, run_every=run_every)
+
+
+# === Debug panel ===
+
+
+def export_runs() -> str:
+    return json.dumps(st.session_state.get(RUNS_KEY, []), indent=2)
+
+
+def show_rerun_timeline():
+    """Timeline of recorded reruns, newest first, with an export for benchmarking."""
+    runs = st.session_state.get(RUNS_KEY, [])
+    if not runs:
+        st.info("No reruns recorded yet.")
+        return
+
+    map_builds = sum(1 for r in runs if "render_brainstorm_locations" in r["stages"])
+    fragment_runs = sum(1 for r in runs if r["scope"] != "app")
+    st.caption(
+        f"{len(runs)} runs · {fragment_runs} fragment-scoped · {map_builds} map rebuilds"
+    )
+    st.dataframe(
+        [
+            {
+                "started": r["started_at"][11:],
+                "scope": r["scope"],
+                "trigger": r["trigger"],
+                "duration (s)": r["duration_s"],
+                "status": r["status"],
+                "stages": ", ".join(f"{k} {v:.2f}s" for k, v in r["stages"].items()),
+            }
+            for r in reversed(runs)
+        ],
+        hide_index=True,
+    )
+    st.download_button(
+        label="📤 Export reruns",
+        data=export_runs(),
+        file_name="rerun_timeline.json",
+        mime="application/json",
+    )
@@ -0,0 +1,220 @@
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_TIME_BUDGET = 1.0  # seconds
+CLUSTER_PENALTY_KM = 100.0  # extra cost of leaving a cluster, keeps clusters together
+
+
+def haversine_matrix(coords, other=None) -> np.ndarray:
+    """
+    Great-circle distances (km) between all (lat, lon) pairs, as an n x n
+    array, or n x m from `coords` to `other`.
+    """
+    radians = np.radians(np.asarray(coords, dtype=float).reshape(-1, 2))
+    lat, lon = radians[:, 0:1], radians[:, 1:2]
+    if other is None:
+        lat2, lon2 = lat.T, lon.T
+    else:
+        other = np.radians(np.asarray(other, dtype=float).reshape(-1, 2))
+        lat2, lon2 = other[:, 0][None, :], other[:, 1][None, :]
+    dlat = lat - lat2
+    dlon = lon - lon2
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def route_length(dist: np.ndarray, order: Sequence[int]) -> float:
+    order = np.asarray(order)
+    return float(dist[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+
+def _nearest_neighbour(dist, prereqs, start):
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    missing = np.array([len(p) for p in prereqs])  # unvisited prerequisites
+    dependents = [[] for _ in range(n)]
+    for v, ps in enumerate(prereqs):
+        for u in ps:
+            dependents[u].append(v)
+
+    order = []
+    current = start
+    while len(order) < n:
+        if current is None:
+            candidates = np.flatnonzero(~visited & (missing == 0))
+            if not len(candidates):  # a dependency cycle; ignore what's left of it
+                candidates = np.flatnonzero(~visited)
+            if order:
+                current = candidates[np.argmin(dist[order[-1], candidates])]
+            else:
+                current = candidates[0]
+        order.append(int(current))
+        visited[current] = True
+        for v in dependents[current]:
+            missing[v] -= 1
+        current = None
+    return order
+
+
+def _positions(order, size=None):
+    """position[stop] = index of stop in order (-1 if absent)."""
+    position = np.full(size or len(order), -1)
+    position[order] = np.arange(len(order))
+    return position
+
+
+def _reversal_violates(order, i, j, prereqs, position):
+    """Would reversing order[i..j] put a stop before one of its prerequisites?"""
+    for k in range(i, j + 1):
+        for u in prereqs[order[k]]:
+            if i <= position[u] <= j:
+                return True
+    return False
+
+
+def _two_opt(dist, order, prereqs, fixed_start, deadline):
+    """
+    Segment reversals until no reversal shortens the path. For each segment
+    start, the gain of every segment end is computed at once with NumPy.
+    """
+    n = len(order)
+    has_prereqs = any(prereqs)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1 if fixed_start else 0, n - 1):
+            b = order[i]
+            js = np.arange(i + 1, n)
+            c = order[js]
+            has_next = js < n - 1
+            e = order[np.minimum(js + 1, n - 1)]
+            # Path reversal replaces (a,b)+(c,e) by (a,c)+(b,e)
+            gain = np.where(has_next, dist[c, e] - dist[b, e], 0.0)
+            if i > 0:
+                a = order[i - 1]
+                gain += dist[a, b] - dist[a, c]
+
+            candidates = np.flatnonzero(gain > 1e-9)
+            for k in candidates[np.argsort(-gain[candidates])]:
+                j = int(js[k])
+                if has_prereqs and _reversal_violates(
+                    order, i, j, prereqs, _positions(order)
+                ):
+                    continue
+                order[i : j + 1] = order[i : j + 1][::-1].copy()
+                improved = True
+                break
+            if time.perf_counter() >= deadline:
+                break
+    return order
+
+
+def _or_opt(dist, order, prereqs, dependents, fixed_start, deadline):
+    """Moves single stops to the cheapest feasible other spot in the path."""
+    n = len(order)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for p in range(1 if fixed_start else 0, n):
+            s = order[p]
+            rest = np.delete(order, p)
+            # Saving from taking s out of the path
+            saving = 0.0
+            if p > 0:
+                saving += dist[order[p - 1], s]
+            if p < n - 1:
+                saving += dist[s, order[p + 1]]
+            if 0 < p < n - 1:
+                saving -= dist[order[p - 1], order[p + 1]]
+
+            # Cost of inserting s before rest[q], for q = 0..n-1 (q = n-1: at the end)
+            prev = np.concatenate(([-1], rest))
+            nxt = np.concatenate((rest, [-1]))
+            cost = np.where(prev >= 0, dist[np.maximum(prev, 0), s], 0.0)
+            cost += np.where(nxt >= 0, dist[s, np.maximum(nxt, 0)], 0.0)
+            both = (prev >= 0) & (nxt >= 0)
+            cost -= np.where(both, dist[np.maximum(prev, 0), np.maximum(nxt, 0)], 0.0)
+
+            # Feasible spots: after all prerequisites and before all dependents
+            position = _positions(rest, n) if (prereqs[s] or dependents[s]) else None
+            lo = 1 if fixed_start else 0
+            hi = n - 1
+            if position is not None:
+                if prereqs[s]:
+                    lo = max(lo, max(position[u] for u in prereqs[s]) + 1)
+                if dependents[s]:
+                    hi = min(hi, min(position[v] for v in dependents[s]))
+            if lo > hi:
+                continue
+            q = lo + int(np.argmin(cost[lo : hi + 1]))
+            if saving - cost[q] > 1e-9 and q != p:
+                order[:] = np.insert(rest, q, s)
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return order
+
+
+def optimize_route(
+    coords,
+    dependencies: Optional[List[List[int]]] = None,
+    clusters: Optional[Sequence] = None,
+    start: Optional[int] = None,
+    time_budget: float = DEFAULT_TIME_BUDGET,
+) -> Dict:
+    """
+    Orders stops to keep the total travel distance short.
+
+    `dependencies[i]` lists stops that must come before stop i; `clusters[i]`
+    (e.g. metadata.cluster_id) makes leaving a cluster cost CLUSTER_PENALTY_KM
+    extra so clusters stay together; `start` fixes the first stop. Builds a
+    nearest-neighbour path that respects the dependencies, then improves it
+    with 2-opt and Or-opt moves until none helps or `time_budget` runs out.
+
+    Returns {"order": [indices], "distance_km", "initial_distance_km", "elapsed"}.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget
+    n = len(coords)
+    if n == 0:
+        return {
+            "order": [],
+            "distance_km": 0.0,
+            "initial_distance_km": 0.0,
+            "elapsed": 0.0,
+        }
+
+    dist = haversine_matrix(coords)
+    cost = dist
+    if clusters is not None:
+        labels = np.array([c if c else f"__none_{i}" for i, c in enumerate(clusters)])
+        cost = dist + CLUSTER_PENALTY_KM * (labels[:, None] != labels[None, :])
+
+    dependencies = dependencies or [[] for _ in range(n)]
+    prereqs = [
+        sorted({u for u in dependencies[i] if u != i and 0 <= u < n}) for i in range(n)
+    ]
+    dependents = [[] for _ in range(n)]
+    for v, ps in enumerate(prereqs):
+        for u in ps:
+            dependents[u].append(v)
+
+    order = np.array(_nearest_neighbour(cost, prereqs, start))
+    initial = route_length(dist, order)
+    fixed_start = start is not None
+    while time.perf_counter() < deadline:
+        before = route_length(cost, order)
+        order = _two_opt(cost, order, prereqs, fixed_start, deadline)
+        order = _or_opt(cost, order, prereqs, dependents, fixed_start, deadline)
+        if route_length(cost, order) >= before - 1e-9:
+            break
+
+    return {
+        "order": [int(i) for i in order],
+        "distance_km": route_length(dist, order),
+        "initial_distance_km": initial,
+        "elapsed": time.perf_counter() - started,
+    }
@@ -0,0 +1,167 @@
+import calendar
+import re
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from lib.brainstorm_data import get_index, register_index
+from lib.filter_index import MONTH_ORDER
+
+# How much a month's suitability moves away from the item's base score
+BEST_BONUS = 0.25
+AVOID_PENALTY = 0.5
+ACTIVITY_BONUS = 0.15  # scaled by the share of the item's activities in season
+DEFAULT_SCORE = 0.5
+_MONTH_RE = re.compile(r"[a-z]{3,}")
+_RANGE_SEP = re.compile(r"\s*(?:–|—|-|to|till|until)\s*")
+_ALL_YEAR = ("all year", "year-round", "year round", "any time", "anytime")
+_MONTH_NAMES = [name.lower() for name in calendar.month_name[1:]]
+
+
+def month_number(name: str) -> Optional[int]:
+    """0-based month for 'Jan', 'january', 'Sept', ... (not 'mayor') or None."""
+    word = (name or "").strip().rstrip(".").lower()
+    if len(word) < 3:
+        return None
+    for number, full in enumerate(_MONTH_NAMES):
+        if full.startswith(word):
+            return number
+    return None
+
+
+def parse_season(text: str) -> np.ndarray:
+    """
+    12-month mask for free-form seasons such as 'Nov–Mar', 'June to August',
+    'Jun, Jul' or 'year-round'. Unrecognized text gives an empty mask.
+    """
+    mask = np.zeros(12, dtype=bool)
+    text = (text or "").lower()
+    if any(phrase in text for phrase in _ALL_YEAR):
+        mask[:] = True
+        return mask
+    for part in re.split(r"[,/&;]|\band\b", text):
+        ends = [
+            month_number(word) for word in _RANGE_SEP.split(part.strip(), maxsplit=1)
+        ]
+        ends = [m for m in ends if m is not None]
+        if len(ends) == 2:
+            start, end = ends
+            span = (end - start) % 12 + 1  # wraps around the new year
+            mask[(start + np.arange(span)) % 12] = True
+        else:
+            for word in _MONTH_RE.findall(part):
+                month = month_number(word)
+                if month is not None:
+                    mask[month] = True
+    return mask
+
+
+def item_month_scores(item: dict) -> np.ndarray:
+    """Suitability of one item for each month, in [0, 1]."""
+    meta = item.get("metadata", {})
+    seasonal = meta.get("seasonal_notes", {}) or {}
+    scores = np.full(12, float(meta.get("score", DEFAULT_SCORE)))
+
+    for month in seasonal.get("best_months", []):
+        if month_number(month) is not None:
+            scores[month_number(month)] += BEST_BONUS
+    for month in seasonal.get("avoid_months", []):
+        if month_number(month) is not None:
+            scores[month_number(month)] -= AVOID_PENALTY
+
+    activities = meta.get("activities", [])
+    if activities:
+        in_season = sum(parse_season(a.get("season", "")) for a in activities)
+        scores += ACTIVITY_BONUS * in_season / len(activities)
+    return np.clip(scores, 0.0, 1.0)
+
+
+def months_mask(months: Iterable) -> np.ndarray:
+    mask = np.zeros(12, dtype=bool)
+    for month in months:
+        number = month if isinstance(month, int) else month_number(month)
+        if number is not None:
+            mask[number] = True
+    return mask
+
+
+class SeasonalIndex:
+    """
+    Item x month suitability matrix. Rows are updated in place on upsert, so
+    window queries are single NumPy reductions over all items.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._clusters: List[Optional[str]] = []
+        self._matrix = np.zeros((0, 12))
+
+    @classmethod
+    def from_items(cls, items):
+        index = cls()
+        items = list(items)
+        index._ids = [item["id"] for item in items]
+        index._rows = {item_id: row for row, item_id in enumerate(index._ids)}
+        index._clusters = [item.get("metadata", {}).get("cluster_id") for item in items]
+        index._matrix = (
+            np.vstack([item_month_scores(item) for item in items])
+            if items
+            else np.zeros((0, 12))
+        )
+        return index
+
+    def upsert(self, item: dict):
+        row = self._rows.get(item["id"])
+        if row is None:
+            row = len(self._ids)
+            self._rows[item["id"]] = row
+            self._ids.append(item["id"])
+            self._clusters.append(None)
+            self._matrix = np.vstack([self._matrix, np.zeros((1, 12))])
+        self._matrix[row] = item_month_scores(item)
+        self._clusters[row] = item.get("metadata", {}).get("cluster_id")
+
+    def window_scores(self, months) -> Dict[str, float]:
+        """Mean suitability over the travel window, per item id."""
+        mask = months_mask(months)
+        if not mask.any():
+            mask[:] = True
+        scores = self._matrix[:, mask].mean(axis=1)
+        return dict(zip(self._ids, scores.tolist()))
+
+    def good_in_window(self, months, threshold=0.6, ids=None) -> List[str]:
+        """Ids of places scoring at least `threshold` in the window, best first."""
+        mask = months_mask(months)
+        if not mask.any() or not self._ids:
+            return []
+        scores = self._matrix[:, mask].mean(axis=1)
+        rows = np.flatnonzero(scores >= threshold)
+        if ids is not None:
+            rows = rows[np.isin(np.asarray(self._ids)[rows], list(ids))]
+        order = rows[np.argsort(-scores[rows], kind="stable")]
+        return [self._ids[row] for row in order]
+
+    def clusters(self) -> List[str]:
+        return sorted({cluster for cluster in self._clusters if cluster})
+
+    def best_month(self, cluster_id: str = None, ids=None) -> Optional[str]:
+        """Month with the highest mean suitability for a cluster (or set of ids)."""
+        if ids is None:
+            rows = [
+                row
+                for row, cluster in enumerate(self._clusters)
+                if cluster == cluster_id
+            ]
+        else:
+            rows = [self._rows[item_id] for item_id in ids if item_id in self._rows]
+        if not rows:
+            return None
+        return MONTH_ORDER[int(np.argmax(self._matrix[rows].mean(axis=0)))]
+
+
+register_index("seasons", SeasonalIndex.from_items)
+
+
+def get_seasonal_index() -> SeasonalIndex:
+    return get_index("seasons")
@@ -0,0 +1,153 @@
+import hashlib
+import json
+from typing import Dict, List
+
+from lib.brainstorm_data import get_index, register_index
+
+# Bookkeeping fields that don't count as an edit
+IGNORED_FIELDS = {"last_edited_timestamp"}
+_MISSING = object()
+
+
+def canonical_hash(value) -> bytes:
+    """Hash of a JSON value that doesn't depend on key order or formatting."""
+    encoded = json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).digest()
+
+
+def field_hashes(item: dict) -> Dict[str, bytes]:
+    """One hash per top-level field; ignored fields are skipped, not copied out."""
+    return {
+        field: canonical_hash(value)
+        for field, value in item.items()
+        if field not in IGNORED_FIELDS
+    }
+
+
+def changed_fields(old: dict, new: dict) -> List[str]:
+    """
+    Top-level fields that were added, removed or changed. Values are compared
+    in place (dict/list equality runs in C), so nothing is copied or encoded.
+    """
+    return sorted(
+        field
+        for field in old.keys() | new.keys()
+        if field not in IGNORED_FIELDS
+        and old.get(field, _MISSING) != new.get(field, _MISSING)
+    )
+
+
+def changed_hashes(
+    old_hashes: Dict[str, bytes], new_hashes: Dict[str, bytes]
+) -> List[str]:
+    """Like `changed_fields`, for two `field_hashes` snapshots."""
+    return sorted(
+        field
+        for field in old_hashes.keys() | new_hashes.keys()
+        if old_hashes.get(field) != new_hashes.get(field)
+    )
+
+
+def _diff_value(old, new, path: str, changes: list):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() | new.keys():
+            _diff_value(
+                old.get(key, _MISSING), new.get(key, _MISSING), f"{path}.{key}", changes
+            )
+    elif old is _MISSING or new is _MISSING or old != new:
+        changes.append(
+            {
+                "path": path,
+                "old": None if old is _MISSING else old,
+                "new": None if new is _MISSING else new,
+            }
+        )
+
+
+def diff_items(old: dict, new: dict, fields=None) -> List[dict]:
+    """
+    Per-field changes between two versions of an item, as {"path", "old",
+    "new"} (the same shape `merge_patch` reports). Only the changed top-level
+    `fields` are walked; nothing is copied.
+    """
+    changes = []
+    for field in changed_fields(old, new) if fields is None else fields:
+        _diff_value(old.get(field, _MISSING), new.get(field, _MISSING), field, changes)
+    changes.sort(key=lambda change: change["path"])
+    return changes
+
+
+class ItemHashIndex:
+    """
+    Field hashes of the items as last saved, by id. Comparing two objects
+    doesn't need them, but an item edited in place is compared with itself;
+    its snapshot is then the only record of what it looked like before.
+    """
+
+    def __init__(self):
+        self._hashes: Dict[str, Dict[str, bytes]] = {}
+
+    @classmethod
+    def from_items(cls, items):
+        index = cls()
+        for item in items:
+            index.upsert(item)
+        return index
+
+    def upsert(self, item: dict):
+        self._hashes[item["id"]] = field_hashes(item)
+
+    def get(self, item_id: str):
+        return self._hashes.get(item_id)
+
+
+register_index("hashes", ItemHashIndex.from_items)
+
+
+def get_hash_index() -> ItemHashIndex:
+    return get_index("hashes")
+
+
+def fields_edited_in_place(item: dict) -> List[str]:
+    """Fields of a stored item that differ from its last saved snapshot."""
+    return changed_hashes(get_hash_index().get(item["id"]) or {}, field_hashes(item))
+
+
+def diff_datasets(old_items, new_items, saved_hashes=None) -> dict:
+    """
+    Compares two versions of the dataset by id. `saved_hashes(id)` (e.g.
+    `get_hash_index().get`) supplies snapshots for items that are the same
+    object on both sides, to catch in-place edits.
+
+    Returns {"added": [ids], "removed": [ids], "changed": {id: [changes]},
+    "fields": {id: [top-level fields]}}. In-place edits are reported by field
+    only, since the old values are gone.
+    """
+    old_by_id = {item["id"]: item for item in old_items if "id" in item}
+    new_ids = set()
+    report = {"added": [], "removed": [], "changed": {}, "fields": {}}
+
+    for item in new_items:
+        item_id = item.get("id")
+        new_ids.add(item_id)
+        old = old_by_id.get(item_id)
+        if old is None:
+            report["added"].append(item_id)
+            continue
+        if old is item:
+            snapshot = saved_hashes(item_id) if saved_hashes else None
+            fields = changed_hashes(snapshot, field_hashes(item)) if snapshot else []
+            changes = [
+                {"path": field, "old": None, "new": item.get(field)} for field in fields
+            ]
+        else:
+            fields = changed_fields(old, item)
+            changes = diff_items(old, item, fields)
+        if fields:
+            report["fields"][item_id] = fields
+            report["changed"][item_id] = changes
+
+    report["removed"] = [item_id for item_id in old_by_id if item_id not in new_ids]
+    return report
@@ -0,0 +1,218 @@
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import streamlit as st
+
+from lib.brainstorm_data import get_index, register_index
+from lib.display_map_locations import focus_map_on_item
+
+# Weight of a term hit per field; a name hit outranks a hit in a long annotation
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "geo_query": 2.0,
+    "annotations": 1.0,
+    "activities": 1.0,
+    "seasonal_notes": 0.5,
+}
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.4
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, accent-stripped word tokens ('Hội An' -> ['hoi', 'an'])."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text.lower())
+
+
+def _field_texts(item: dict):
+    meta = item.get("metadata", {})
+    yield "name", item.get("name", "")
+    yield "geo_query", item.get("geo_query", "")
+    for annotation in item.get("annotations", []):
+        yield "annotations", annotation.get("text", "")
+    for activity in meta.get("activities", []):
+        yield "activities", activity.get("description", "")
+    yield "seasonal_notes", meta.get("seasonal_notes", {}).get("notes", "")
+
+
+def _trigrams(token: str):
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _within_distance(a: str, b: str, max_distance: int) -> bool:
+    """Levenshtein distance check that bails out once a row exceeds the bound."""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        if min(current) > max_distance:
+            return False
+        previous = current
+    return previous[-1] <= max_distance
+
+
+class TextIndex:
+    """
+    In-memory inverted index over item names, geo queries, annotations,
+    activities and seasonal notes. Supports exact, prefix and fuzzy term
+    matching and is updated per item on edit.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._terms_by_id: Dict[str, set] = {}
+        self._vocabulary: List[str] = []  # sorted, for prefix lookups
+        self._trigrams: Dict[str, set] = defaultdict(set)  # for fuzzy lookups
+
+    @classmethod
+    def from_items(cls, items) -> "TextIndex":
+        index = cls()
+        for item in items:
+            index.upsert(item)
+        return index
+
+    def __len__(self):
+        return len(self._terms_by_id)
+
+    # === Maintenance ===
+
+    def _add_term(self, term: str):
+        insort(self._vocabulary, term)
+        for gram in _trigrams(term):
+            self._trigrams[gram].add(term)
+
+    def _drop_term(self, term: str):
+        del self._postings[term]
+        self._vocabulary.pop(bisect_left(self._vocabulary, term))
+        for gram in _trigrams(term):
+            self._trigrams[gram].discard(term)
+            if not self._trigrams[gram]:
+                del self._trigrams[gram]
+
+    def upsert(self, item: dict):
+        item_id = item["id"]
+        self.remove(item_id)
+
+        weights = defaultdict(float)
+        for field, text in _field_texts(item):
+            for term in tokenize(text):
+                weights[term] += FIELD_WEIGHTS[field]
+
+        for term, weight in weights.items():
+            if term not in self._postings:
+                self._add_term(term)
+            self._postings[term][item_id] = weight
+        self._terms_by_id[item_id] = set(weights)
+
+    def remove(self, item_id: str):
+        for term in self._terms_by_id.pop(item_id, ()):
+            postings = self._postings[term]
+            postings.pop(item_id, None)
+            if not postings:
+                self._drop_term(term)
+
+    # === Querying ===
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                terms.append(term)
+        return terms
+
+    def _fuzzy_terms(self, token: str) -> List[str]:
+        max_distance = 1 if len(token) <= 5 else 2
+        candidates = defaultdict(int)
+        for gram in _trigrams(token):
+            for term in self._trigrams.get(gram, ()):
+                candidates[term] += 1
+        # Only verify terms sharing a reasonable number of trigrams
+        min_shared = max(1, len(_trigrams(token)) - 3 * max_distance)
+        return [
+            term
+            for term, shared in candidates.items()
+            if shared >= min_shared
+            and term != token
+            and _within_distance(token, term, max_distance)
+        ]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Returns (item_id, score) hits, best first. Every query token must
+        match exactly, as a prefix, or fuzzily (typos) for an item to count.
+        """
+        tokens = tokenize(query)
+        if not tokens or not self._terms_by_id:
+            return []
+
+        total = len(self._terms_by_id)
+        scores = None
+        for token in tokens:
+            expansions = [(token, 1.0)] if token in self._postings else []
+            expansions += [(t, PREFIX_FACTOR) for t in self._prefix_terms(token)]
+            if not expansions and len(token) >= 3:
+                expansions = [(t, FUZZY_FACTOR) for t in self._fuzzy_terms(token)]
+
+            token_scores = defaultdict(float)
+            for term, factor in expansions:
+                postings = self._postings[term]
+                idf = math.log(1 + total / len(postings))
+                for item_id, weight in postings.items():
+                    token_scores[item_id] = max(
+                        token_scores[item_id], factor * weight * idf
+                    )
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    item_id: score + token_scores[item_id]
+                    for item_id, score in scores.items()
+                    if item_id in token_scores
+                }
+            if not scores:
+                return []
+
+        return sorted(scores.items(), key=lambda hit: hit[1], reverse=True)[:limit]
+
+
+register_index("search", TextIndex.from_items)
+
+
+def get_text_index() -> TextIndex:
+    return get_index("search")
+
+
+def show_search_results(query: str, limit: int = 8):
+    """Sidebar hit list; clicking a hit selects the item and centers the map on it."""
+    hits = get_text_index().search(query, limit=limit)
+    if not hits:
+        st.caption("No matching places.")
+        return
+
+    items = {item["id"]: item for item in st.session_state.brainstorm_data}
+    for item_id, _ in hits:
+        item = items.get(item_id)
+        if item is None:
+            continue
+        if st.button(
+            f"📍 {item['name']} · {item.get('country', '')}",
+            key=f"search_hit_{item_id}",
+            use_container_width=True,
+        ):
+            focus_map_on_item(item)
@@ -1,11 +1,9 @@
 import streamlit as st
-from streamlit_folium import st_folium
 import json
 from streamlit_float import float_init, float_css_helper
 
 from lib.itinerary_view import render_itinerary_overview
 
-
 st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed",
@@ -16,23 +14,38 @@ st.set_page_config(
     },
 )
 float_init()
-# if not st.session_state.get("rerun_count"):
-#     st.session_state.rerun_count = 0
 
-# st.session_state.rerun_count += 1
-# st.toast(f"{datetime.datetime.now()} rerender {st.session_state.rerun_count}!")
+from lib.rerun_tracker import (
+    finish_run,
+    rerun,
+    show_rerun_timeline,
+    start_run,
+    tracked_fragment,
+)
+
+start_run()
 
 from lib.batch_edit_flow import maybe_show_batch_enrich_fragment
 from lib.cache import time_function
-from lib.image_fetcher import enrich_items_with_images
+from lib.invalidation import memoize_on_signals
+from lib.http_client import get_metrics as http_metrics
+from lib.image_enrichment import (
+    maybe_show_image_enrichment_progress,
+    start_image_enrichment,
+)
 from lib.render_edit_panel import render_edit_panel
 from lib.brainstorm_data import (
     load_brainstorm_data,
+    reload_brainstorm_data,
 )
 from menu import menu_with_redirect
-from lib.db import init_app_data
+from lib.db import init_app_data, reload_app_data_if_changed
 from lib.add_data_flow import maybe_show_add_places_fragment
 from lib.filter_controls import show_filter_controls
+from lib.filter_index import MONTH_ORDER, get_facet_index
+from lib.seasonal_scoring import get_seasonal_index
+from lib.cluster_aggregation import get_cluster_index
+from lib.text_search import show_search_results
 from lib.display_map_locations import render_brainstorm_locations
 
 # === Page Setup ===
@@ -41,12 +54,15 @@ menu_with_redirect()
 # === Session State Initialization ===
 if "AppUserData" not in st.session_state:
     init_app_data()
+elif reload_app_data_if_changed():
+    reload_brainstorm_data()
+    st.toast("🔄 Loaded changes saved in another tab")
 if "brainstorm_data" not in st.session_state:
     st.session_state.brainstorm_data = load_brainstorm_data()
 if "add_data_step" not in st.session_state:
     st.session_state.add_data_step = 0
 if "add_data_raw" not in st.session_state:
-    st.session_state.add_data_raw = "[]"
+    st.session_state.add_data_raw = ""
 if "enrich_step" not in st.session_state:
     st.session_state.enrich_step = 0
 if "show_edit_panel" not in st.session_state:
@@ -55,34 +71,65 @@ if "show_edit_panel" not in st.session_state:
 # === Map Toolkit Section ===
 st.sidebar.markdown("## 📍 Map Toolkit")
 
-# Search bar (currently inactive)
-# st.sidebar.text_input(
-#     "🔍 Search for a place", placeholder="(coming soon)", disabled=True
-# )
+# Search bar
+search_query = st.sidebar.text_input(
+    "🔍 Search for a place",
+    placeholder="Name, activity, note…",
+    key="place_search",
+)
+if search_query:
+    with st.sidebar:
+        show_search_results(search_query)
 
 # Primary action
-if st.sidebar.button("➕ Add New Place"):
+if st.sidebar.button("➕ Add New Place", key="add_place_button"):
     st.session_state.add_data_step = 1
-    st.rerun()
+    st.session_state.add_data_rejected = None
+    rerun()
 
 # === Filters Section ===
 st.sidebar.markdown("## 🗂 Filters")
 with st.sidebar:
     brainstorm_data = st.session_state.brainstorm_data
-    selected_statuses, selected_countries = show_filter_controls(
-        brainstorm_data,
+    facet_index = get_facet_index()
+    filters = show_filter_controls(
+        facet_index,
         st.session_state["AppUserData"].get("brainstorm_filters", {}),
     )
+    visible_ids = frozenset(facet_index.select(**filters))
+
+    travel_months = st.multiselect(
+        "🗓 Travel months",
+        options=MONTH_ORDER,
+        placeholder="Color by overall score",
+        help="Colors places by how well they suit these months.",
+        key="travel_months",
+    )
+    seasonal_index = get_seasonal_index()
+    if seasonal_index.clusters():
+        st.caption(
+            "Best month per cluster: "
+            + ", ".join(
+                f"{cluster} {seasonal_index.best_month(cluster)}"
+                for cluster in seasonal_index.clusters()
+            )
+        )
+    if travel_months:
+        if st.toggle("Only places that suit these months", key="only_in_season"):
+            visible_ids = frozenset(
+                seasonal_index.good_in_window(travel_months, ids=visible_ids)
+            )
 
 # === Advanced Tools ===
 st.sidebar.markdown("### ⚙️ Advanced")
 with st.sidebar.expander("Show advanced tools", expanded=False):
-    if st.button("📝 Batch Edit"):
+    if st.button("📝 Batch Edit", key="batch_edit_button"):
         st.session_state.enrich_step = 1
-        st.rerun()
+        rerun()
 
-    if st.button("🔄 Fetch 5 new images!"):
-        enrich_items_with_images(brainstorm_data)
+    if st.button("🔄 Fetch missing images", key="fetch_images_button"):
+        start_image_enrichment(brainstorm_data)
+    maybe_show_image_enrichment_progress()
 
     st.download_button(
         label="📤 Export Data",
@@ -91,6 +138,13 @@ with st.sidebar.expander("Show advanced tools", expanded=False):
         mime="application/json",
     )
 
+    if st.toggle("🐞 Show rerun timeline", key="show_rerun_timeline"):
+        show_rerun_timeline()
+        metrics = http_metrics()
+        if metrics:
+            st.caption("Outbound HTTP requests by host (this server process)")
+            st.dataframe(metrics, hide_index=True)
+
 st.sidebar.markdown("---")
 # === Add/Edit Data Flow ===
 
@@ -98,39 +152,18 @@ maybe_show_add_places_fragment()
 maybe_show_batch_enrich_fragment()
 
 
-# === Fill Map With Locations ===
-map_view = render_brainstorm_locations(
-    brainstorm_data=brainstorm_data,
-    selected_statuses=selected_statuses,
-    selected_countries=selected_countries,
-)
-
-
-# Draw(
-#     export=True,
-#     filename="drawn_data.geojson",
-#     position="topleft",
-#     draw_options={
-#         "polyline": True,
-#         "polygon": True,
-#         "circle": False,
-#         "rectangle": True,
-#         "marker": True,
-#         "circlemarker": False,
-#     },
-#     edit_options={"edit": True, "remove": True},
-# ).add_to(map_view)
-
-
 # === Layout ===
 @time_function
 def render_map(map_view_obj):
+    # Deferred with folium, see render_brainstorm_locations
+    from streamlit_folium import st_folium
+
     map_output = st_folium(
         map_view_obj,
         use_container_width=True,
         height=600,
-        zoom=st.session_state.get("map", {}).get("zoom", 4),
-        center=st.session_state.get("map", {}).get("center"),
+        zoom=st.session_state.get("map_focus", {}).get("zoom", 4),
+        center=st.session_state.get("map_focus", {}).get("center"),
         returned_objects=["last_object_clicked_tooltip"],
         key="map",
     )
@@ -138,15 +171,67 @@ def render_map(map_view_obj):
     # Track clicked item
     clicked_id = map_output.get("last_object_clicked_tooltip")
     if clicked_id and clicked_id != st.session_state.get("selected_item"):
+        # The click already reruns the map fragment, which draws the edit
+        # panel fragment after the (memoized) map, so no further rerun
         st.session_state.show_edit_panel = True
         st.session_state.selected_item = clicked_id
 
 
-render_map(map_view_obj=map_view)
+def cluster_summaries(visible_ids):
+    seasonal_index = get_seasonal_index()
+    return [
+        dict(summary, best_month=seasonal_index.best_month(ids=summary["ids"]))
+        for summary in get_cluster_index().summaries(visible_ids)
+    ]
+
+
+@tracked_fragment
+def map_fragment(visible_ids, travel_months=()):
+    # Only rebuilt when the data or the active filters change, so panel
+    # toggles, flows and itinerary edits reuse the existing folium map.
+    map_view = memoize_on_signals(
+        "brainstorm_map",
+        ["brainstorm_data"],
+        lambda: render_brainstorm_locations(
+            brainstorm_data=st.session_state.brainstorm_data,
+            visible_ids=visible_ids,
+            facet_index=get_facet_index(),
+            month_scores=(
+                get_seasonal_index().window_scores(travel_months)
+                if travel_months
+                else None
+            ),
+            cluster_summaries=cluster_summaries(visible_ids),
+        ),
+        extra=(visible_ids, tuple(travel_months)),
+    )
+
+    # Draw(
+    #     export=True,
+    #     filename="drawn_data.geojson",
+    #     position="topleft",
+    #     draw_options={
+    #         "polyline": True,
+    #         "polygon": True,
+    #         "circle": False,
+    #         "rectangle": True,
+    #         "marker": True,
+    #         "circlemarker": False,
+    #     },
+    #     edit_options={"edit": True, "remove": True},
+    # ).add_to(map_view)
+
+    render_map(map_view_obj=map_view)
+    # Nested so a marker click redraws the panel without an app rerun; the
+    # panel's own buttons still rerun only the panel
+    edit_panel_fragment()
 
 
 # === Floating right-hand sidebar ===
-if st.session_state.get("selected_item"):
+@tracked_fragment
+def edit_panel_fragment():
+    if not st.session_state.get("selected_item"):
+        return
 
     if st.session_state.get("show_edit_panel", True):
         # === Expanded Panel ===
@@ -158,9 +243,11 @@ if st.session_state.get("selected_item"):
                     "›", key="minimize_edit_panel", help="Minimize", type="tertiary"
                 ):
                     st.session_state.show_edit_panel = False
-                    st.rerun()
+                    rerun(scope="fragment")
             with col2:
-                render_edit_panel(brainstorm_data, st.session_state["selected_item"])
+                render_edit_panel(
+                    st.session_state.brainstorm_data, st.session_state["selected_item"]
+                )
 
         float_css = float_css_helper(
             width="20rem",
@@ -187,7 +274,7 @@ if st.session_state.get("selected_item"):
                     "‹", key="expand_edit_panel", help="Open Sidebar", type="tertiary"
                 ):
                     st.session_state.show_edit_panel = True
-                    st.rerun()
+                    rerun(scope="fragment")
 
         mini_css = float_css_helper(
             width="3.5rem",  # small button-sized width
@@ -206,6 +293,9 @@ if st.session_state.get("selected_item"):
         mini_dialog.float(mini_css)
 
 
+map_fragment(visible_ids, travel_months)
+
+
 # col1, col2 = st.columns([2, 1])
 
 # # === Left Column: Map Rendering ===
@@ -220,3 +310,5 @@ if st.session_state.get("selected_item"):
 
 with st.expander("Itinerary"):
     render_itinerary_overview()
+
+finish_run()
@@ -0,0 +1,51 @@
+"""
+Serial vs concurrent geocoding against the local stub server, with DynamoDB
+replaced by an in-memory cache that takes `latency` seconds per call. Run it with
+
+    python scripts/bench_async_geocoding.py [queries] [latency_seconds]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import geo_resolver  # noqa: E402
+from lib.async_clients import resolve_many  # noqa: E402
+from scripts.stub_server import start_stub_server  # noqa: E402
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    server, base_url = start_stub_server()
+    geo_resolver.NOMINATIM_URL = f"{base_url}/search"
+
+    store = {}
+
+    def get_cached(key):
+        time.sleep(latency)
+        return store.get(key)
+
+    def put_cached(key, data, ttl_hours=24):
+        time.sleep(latency)
+        store[key] = data
+
+    geo_resolver.get_cached = get_cached
+    geo_resolver.put_cached = put_cached
+
+    names = [f"place {i}, Region, Country" for i in range(count)]
+    for label in ("cold", "cached"):
+        for mode in ("serial", "concurrent"):
+            geo_resolver._memo.clear()  # only the (slow) shared cache survives
+            if label == "cold":
+                store.clear()
+            start = time.perf_counter()
+            if mode == "serial":
+                results = [geo_resolver.resolve_geo_query(name) for name in names]
+            else:
+                results = list(resolve_many(names).values())
+            elapsed = time.perf_counter() - start
+            assert all(result and "error" not in result for result, _ in results)
+            print(f"{label:>6} {mode:>10}: {elapsed:6.2f}s for {count} queries")
+    server.shutdown()
@@ -0,0 +1,71 @@
+"""
+Benchmark for the route optimizer on random stops across Southeast Asia.
+Run it with
+
+    python scripts/bench_route_optimizer.py [time_budget_seconds]
+"""
+
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.route_optimizer import haversine_matrix, optimize_route  # noqa: E402
+
+SIZES = [50, 100, 250, 500]
+
+
+def python_matrix(coords):
+    """Pure-Python haversine, to show what the vectorized matrix saves."""
+
+    def haversine(a, b):
+        lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+        h = (
+            math.sin((lat2 - lat1) / 2) ** 2
+            + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        )
+        return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+    return [[haversine(a, b) for b in coords] for a in coords]
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    rng = np.random.default_rng(0)
+    print(
+        f"{'stops':>5} {'matrix py':>10} {'matrix np':>10}"
+        f" {'nn km':>9} {'opt km':>9} {'gain':>6} {'time':>7}"
+    )
+
+    for n in SIZES:
+        coords = np.c_[rng.uniform(-10, 25, n), rng.uniform(95, 130, n)]
+        # Every 5th stop depends on a random earlier one, ten clusters
+        dependencies = [
+            [int(rng.integers(i))] if i and i % 5 == 0 else [] for i in range(n)
+        ]
+        clusters = [f"c{i % 10}" for i in range(n)]
+
+        start = time.perf_counter()
+        python_matrix(coords.tolist())
+        py_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        haversine_matrix(coords)
+        np_ms = (time.perf_counter() - start) * 1000
+
+        route = optimize_route(coords, dependencies, clusters, time_budget=budget)
+        position = {stop: i for i, stop in enumerate(route["order"])}
+        assert all(
+            position[u] < position[v]
+            for v, deps in enumerate(dependencies)
+            for u in deps
+        )
+
+        gain = 1 - route["distance_km"] / route["initial_distance_km"]
+        print(
+            f"{n:>5} {py_ms:>8.1f}ms {np_ms:>8.1f}ms {route['initial_distance_km']:>9.0f} "
+            f"{route['distance_km']:>9.0f} {gain:>6.1%} {route['elapsed']:>6.2f}s"
+        )
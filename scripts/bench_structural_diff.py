@@ -0,0 +1,102 @@
+"""
+Micro-benchmark: the old deepcopy comparison vs the structural diff, on a
+synthetic dataset with nested metadata. Run it with
+
+    python scripts/bench_structural_diff.py [item_count]
+"""
+
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.structural_diff import ItemHashIndex, diff_datasets  # noqa: E402
+
+MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+
+
+def make_item(i: int) -> dict:
+    return {
+        "id": f"place-{i}",
+        "name": f"Place {i}",
+        "geo_query": f"Place {i}, Somewhere",
+        "image_query": f"place {i} landscape",
+        "country": random.choice(["Philippines", "Japan", "Peru", "Norway"]),
+        "location_type": random.choice(["region", "city", "place"]),
+        "category": random.choice(["nature", "hiking", "culture", "beach"]),
+        "last_edited_timestamp": "2025-01-01T00:00:00",
+        "metadata": {
+            "status": random.choice(["included", "maybe", "skip"]),
+            "score": round(random.random(), 2),
+            "budget_level": random.choice(["low", "medium", "high"]),
+            "access_notes": "Bus from the capital, then a tricycle. " * 3,
+            "activities": [
+                {"description": f"Activity {j} at place {i}", "season": "dry"}
+                for j in range(5)
+            ],
+            "seasonal_notes": {
+                "best_months": random.sample(MONTHS, 4),
+                "avoid_months": random.sample(MONTHS, 2),
+                "notes": "Typhoon season brings heavy rain.",
+            },
+            "images": [f"https://images.example.com/{i}/{j}.jpg" for j in range(3)],
+        },
+        "annotations": [{"id": f"a{j}", "text": f"Note {j}"} for j in range(3)],
+    }
+
+
+def deepcopy_changed(edited, original):
+    """The previous implementation, minus the timestamp update."""
+    original_by_id = {e["id"]: e for e in original}
+    changed = 0
+    for entry in edited:
+        old_clean = copy.deepcopy(original_by_id.get(entry["id"], {}))
+        new_clean = copy.deepcopy(entry)
+        for e in [old_clean, new_clean]:
+            e.pop("last_edited_timestamp", None)
+        changed += old_clean != new_clean
+    return changed
+
+
+def timed(label, func, repeat=3):
+    best = min(_once(func) for _ in range(repeat))
+    print(f"{label:<40} {best * 1000:8.1f} ms")
+    return best
+
+
+def _once(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    random.seed(0)
+    original = [make_item(i) for i in range(count)]
+    # Round-trip through JSON like the editor does, then edit 1% of the items
+    edited = json.loads(json.dumps(original))
+    for item in random.sample(edited, max(1, count // 100)):
+        item["metadata"]["seasonal_notes"]["notes"] = "Edited"
+        item["last_edited_timestamp"] = "2025-06-01T00:00:00"
+
+    print(f"{count} items, {max(1, count // 100)} edited\n")
+    old = timed(
+        "deepcopy + compare (previous)", lambda: deepcopy_changed(edited, original)
+    )
+    new = timed("structural diff", lambda: diff_datasets(original, edited))
+    timed("snapshot hashes (once per save)", lambda: ItemHashIndex.from_items(original))
+    index = ItemHashIndex.from_items(original)
+    timed(
+        "in-place edits via snapshots",
+        lambda: diff_datasets(original, original, index.get),
+    )
+
+    report = diff_datasets(original, edited)
+    assert len(report["changed"]) == deepcopy_changed(edited, original)
+    assert all(fields == ["metadata"] for fields in report["fields"].values())
+    print(f"\nspeedup: {old / new:.1f}x")
@@ -0,0 +1,82 @@
+"""
+Builds the local gazetteer (static/gazetteer.tsv + .idx) that
+resolve_geo_query consults before Nominatim. Takes a GeoNames dump, e.g.
+https://download.geonames.org/export/dump/cities15000.zip, and optionally
+admin1CodesASCII.txt from the same place for region names:
+
+    python scripts/build_gazetteer.py cities15000.txt [admin1CodesASCII.txt]
+"""
+
+import csv
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.country_lookup import normalize_name  # noqa: E402
+from lib.gazetteer import GAZETTEER_PATH, INDEX_SUFFIX, OFFSET_DTYPE  # noqa: E402
+
+# GeoNames "geoname" table columns
+NAME, ASCII_NAME, ALTERNATE_NAMES, LAT, LON = 1, 2, 3, 4, 5
+FEATURE_CLASS, COUNTRY_CODE, ADMIN1, POPULATION = 6, 8, 10, 14
+# Populated places and administrative areas; skips hotels, peaks, rivers, ...
+FEATURE_CLASSES = {"P", "A"}
+
+csv.field_size_limit(sys.maxsize)
+
+
+def load_admin1_names(path: str) -> dict:
+    """'PH.40' -> 'Caraga'."""
+    names = {}
+    with open(path, encoding="utf-8") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            names[row[0]] = row[2] or row[1]
+    return names
+
+
+def read_places(path: str, admin1_names: dict):
+    """Yields (key, line) for each name and alternate name of each place."""
+    with open(path, encoding="utf-8") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if row[FEATURE_CLASS] not in FEATURE_CLASSES:
+                continue
+            country_code = row[COUNTRY_CODE]
+            admin1 = admin1_names.get(f"{country_code}.{row[ADMIN1]}", "")
+            fields = [
+                row[NAME],
+                row[LAT],
+                row[LON],
+                country_code,
+                admin1,
+                row[POPULATION] or "0",
+            ]
+            line = "\t".join(field.replace("\t", " ") for field in fields)
+
+            names = [row[NAME], row[ASCII_NAME], *row[ALTERNATE_NAMES].split(",")]
+            keys = {normalize_name(name) for name in names}
+            for key in keys - {""}:
+                yield key, int(row[POPULATION] or 0), line
+
+
+def build_gazetteer(places, path: str = GAZETTEER_PATH) -> int:
+    """Writes the sorted gazetteer and its offset index; returns the line count."""
+    rows = sorted(places, key=lambda row: (row[0], -row[1]))
+    offsets = np.empty(len(rows), dtype=OFFSET_DTYPE)
+    with open(path, "wb") as f:
+        for i, (key, _, line) in enumerate(rows):
+            offsets[i] = f.tell()
+            f.write(f"{key}\t{line}\n".encode("utf-8"))
+    offsets.tofile(path + INDEX_SUFFIX)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    if not sys.argv[1:]:
+        print(__doc__)
+        sys.exit(1)
+    admin1_names = load_admin1_names(sys.argv[2]) if len(sys.argv) > 2 else {}
+    count = build_gazetteer(read_places(sys.argv[1], admin1_names))
+    size = os.path.getsize(GAZETTEER_PATH) / 1e6
+    print(f"✅ Done! {count} names saved to {GAZETTEER_PATH} ({size:.1f} MB)")
@@ -1,61 +1,127 @@
-import requests
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pycountry
-import time
-from lib.cache import cache_response
 
-OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def get_area_id_for_country(iso_code: str, country_name: str) -> int | None:
-    query = f"""
-    [out:json][timeout:25];
-    relation["admin_level"="2"]["boundary"="administrative"]
-      ["ISO3166-1"="{iso_code}"];
-    out ids;
-    """
-    response = requests.post(OVERPASS_URL, data={"data": query})
-    response.raise_for_status()
-    data = response.json()
+from lib import http_client  # noqa: E402
 
-    if data["elements"]:
-        return 3600000000 + data["elements"][0]["id"]
+OVERPASS_URL = os.environ.get("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+AREA_ID_OFFSET = 3600000000  # Overpass area id = relation id + offset
+BATCH_SIZE = 40  # ISO codes per union query
+MAX_CONCURRENT = 2  # Overpass gives each IP two query slots by default
+CHECKPOINT_PATH = "country_area_ids.checkpoint.json"
 
-    # Fallback: try matching by exact name
-    name_query = f"""
-    [out:json][timeout:25];
-    relation["admin_level"="2"]["boundary"="administrative"]
-      ["name"="{country_name}"];
-    out ids;
-    """
-    response = requests.post(OVERPASS_URL, data={"data": name_query})
+_COUNTRY_RELATION = '["admin_level"="2"]["boundary"="administrative"]'
+
+
+def _run_query(body: str) -> list:
+    query = f"[out:json][timeout:120];\n(\n{body}\n);\nout tags;"
+    response = http_client.post(OVERPASS_URL, data={"data": query}, timeout=(5, 180))
     response.raise_for_status()
-    data = response.json()
+    return response.json()["elements"]
 
-    if data["elements"]:
-        return 3600000000 + data["elements"][0]["id"]
 
-    return None
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
 
 
-def generate_all_country_area_ids(sleep_seconds=1.2):
+def area_ids_by_iso(iso_codes: list) -> dict:
+    """One union query for a batch of ISO 3166-1 codes; returns {iso: area_id}."""
+    pattern = "|".join(iso_codes)
+    elements = _run_query(f'relation{_COUNTRY_RELATION}["ISO3166-1"~"^({pattern})$"];')
     result = {}
-    countries = list(pycountry.countries)
+    for element in elements:
+        iso = element.get("tags", {}).get("ISO3166-1")
+        if iso in iso_codes:
+            result.setdefault(iso, AREA_ID_OFFSET + element["id"])
+    return result
+
+
+def area_ids_by_name(names: dict) -> dict:
+    """Fallback for relations without an ISO tag: {iso: name} -> {iso: area_id}."""
+    body = "\n".join(
+        f'relation{_COUNTRY_RELATION}["{key}"="{_quote(name)}"];'
+        for name in names.values()
+        for key in ("name", "name:en")
+    )
+    by_name = {}
+    for element in _run_query(body):
+        tags = element.get("tags", {})
+        for key in ("name", "name:en"):
+            by_name.setdefault(tags.get(key), AREA_ID_OFFSET + element["id"])
+    return {iso: by_name[name] for iso, name in names.items() if name in by_name}
+
+
+def load_checkpoint(path=CHECKPOINT_PATH) -> dict:
+    """{"found": {iso: area_id}, "missing": [isos the name fallback didn't find]}."""
+    if not os.path.exists(path):
+        return {"found": {}, "missing": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(checkpoint: dict, path=CHECKPOINT_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)  # a crash mid-write keeps the previous checkpoint
 
-    for country in countries:
-        iso = country.alpha_2
-        name = country.name
-        print(f"🔍 {iso}: {name}")
+
+def generate_all_country_area_ids(checkpoint_path=CHECKPOINT_PATH):
+    """
+    Looks up the Overpass area id of every country, BATCH_SIZE ISO codes per
+    query with MAX_CONCURRENT queries in flight; countries without an ISO tag
+    are retried by name in one final query. Progress is checkpointed after
+    every batch, so a rerun after a crash only asks for what's left.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    names = {country.alpha_2: country.name for country in pycountry.countries}
+    done = set(checkpoint["found"]) | set(checkpoint["missing"])
+    todo = sorted(iso for iso in names if iso not in done)
+    print(f"🔍 {len(done)} countries done, {len(todo)} to go")
+
+    lock = threading.Lock()
+    unmatched = []
+    batches = [todo[i : i + BATCH_SIZE] for i in range(0, len(todo), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT) as pool:
+        futures = {pool.submit(area_ids_by_iso, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                found = future.result()
+            except Exception as e:
+                print(f"❌ Error for {batch[0]}..{batch[-1]}: {e} (rerun to retry)")
+                continue
+            with lock:
+                checkpoint["found"].update(found)
+                unmatched.extend(iso for iso in batch if iso not in found)
+                save_checkpoint(checkpoint, checkpoint_path)
+            print(f"✅ {batch[0]}..{batch[-1]}: {len(found)}/{len(batch)} found")
+
+    if unmatched:
         try:
-            area_id = get_area_id_for_country(iso, name)
-            if area_id:
-                print(f"✅ {iso} → {area_id}")
-                result[iso] = area_id
-            else:
-                print(f"⚠️  Not found: {iso}")
+            found = area_ids_by_name({iso: names[iso] for iso in unmatched})
         except Exception as e:
-            print(f"❌ Error for {iso}: {e}")
-        time.sleep(sleep_seconds)  # prevent rate limit
+            print(f"❌ Error in the name fallback: {e} (rerun to retry)")
+        else:
+            checkpoint["found"].update(found)
+            checkpoint["missing"] = sorted(
+                set(checkpoint["missing"])
+                | {iso for iso in unmatched if iso not in found}
+            )
+            save_checkpoint(checkpoint, checkpoint_path)
+            for iso in unmatched:
+                if iso in found:
+                    print(f"✅ {iso} → {found[iso]}")
+                else:
+                    print(f"⚠️  Not found: {iso}")
 
-    return result
+    return checkpoint["found"]
 
 
 def save_as_python_module(mapping: dict, filename="country_area_ids.py"):
@@ -67,8 +133,71 @@ def save_as_python_module(mapping: dict, filename="country_area_ids.py"):
         f.write("}\n")
 
 
+# Everyday names pycountry doesn't list as name, common_name or official_name
+EXTRA_ALIASES = {
+    "AE": ["UAE"],
+    "BN": ["Brunei"],
+    "CD": ["DR Congo", "DRC", "Democratic Republic of the Congo"],
+    "CG": ["Republic of the Congo"],
+    "CI": ["Ivory Coast"],
+    "CV": ["Cape Verde"],
+    "CZ": ["Czech Republic"],
+    "FM": ["Micronesia"],
+    "GB": ["UK", "Great Britain", "Britain", "England", "Scotland", "Wales"],
+    "KP": ["North Korea"],
+    "KR": ["Korea"],
+    "MK": ["Macedonia"],
+    "MM": ["Burma"],
+    "NL": ["Holland"],
+    "PS": ["Palestine"],
+    "RU": ["Russia"],
+    "SZ": ["Swaziland"],
+    "TL": ["East Timor"],
+    "TR": ["Turkey"],
+    "US": ["USA", "America", "United States of America"],
+    "VA": ["Vatican", "Vatican City"],
+}
+
+
+def build_country_table() -> list:
+    """One entry per country: ISO codes, display name and every known alias."""
+    table = []
+    for country in pycountry.countries:
+        names = [
+            getattr(country, "common_name", None),
+            country.name,
+            getattr(country, "official_name", None),
+        ]
+        names = [name for name in names if name]
+        aliases = names + EXTRA_ALIASES.get(country.alpha_2, [])
+        table.append(
+            {
+                "alpha_2": country.alpha_2,
+                "alpha_3": country.alpha_3,
+                "name": names[0],
+                "aliases": list(dict.fromkeys(aliases)),
+            }
+        )
+    return sorted(table, key=lambda entry: entry["alpha_2"])
+
+
+def save_country_table(table: list, filename="static/countries.json"):
+    # One country per line keeps regenerated diffs readable
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        f.write(",\n".join(json.dumps(entry, ensure_ascii=False) for entry in table))
+        f.write("\n]\n")
+
+
 if __name__ == "__main__":
-    print("🚀 Generating country → area ID mapping...")
-    mapping = generate_all_country_area_ids()
-    save_as_python_module(mapping)
-    print(f"\n✅ Done! {len(mapping)} countries saved to country_area_ids.py")
+    if sys.argv[1:] == ["table"]:
+        table = build_country_table()
+        save_country_table(table)
+        print(f"✅ Done! {len(table)} countries saved to static/countries.json")
+    else:
+        if "--restart" in sys.argv[1:] and os.path.exists(CHECKPOINT_PATH):
+            os.remove(CHECKPOINT_PATH)
+        print("🚀 Generating country → area ID mapping...")
+        mapping = generate_all_country_area_ids()
+        save_as_python_module(mapping)
+        print(f"\n✅ Done! {len(mapping)} countries saved to country_area_ids.py")
@@ -0,0 +1,78 @@
+"""
+Import-time profile of the app's modules, to keep cold starts fast. Imports
+every lib module (or the given ones) in a fresh interpreter under
+`python -X importtime` and reports the slowest imports. Run it with
+
+    python scripts/profile_imports.py [module ...] [--top N]
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = (
+    "boto3",
+    "botocore",
+    "folium",
+    "streamlit_folium",
+    "branca",
+    "jinja2",
+    "numpy",
+    "PIL",
+)
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def lib_modules() -> list:
+    return sorted(
+        f"lib.{name[:-3]}"
+        for name in os.listdir(os.path.join(ROOT, "lib"))
+        if name.endswith(".py") and name != "__init__.py"
+    )
+
+
+def profile(modules: list) -> list:
+    """[(module, self_us, cumulative_us, depth)] for everything the import pulled in."""
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    top = 15
+    if "--top" in args:
+        i = args.index("--top")
+        top = int(args[i + 1])
+        del args[i : i + 2]
+    modules = args or lib_modules()
+
+    rows = profile(modules)
+    total = sum(self_us for _, self_us, _, _ in rows)
+    print(
+        f"Importing {len(modules)} modules: {total / 1000:.0f} ms,"
+        f" {len(rows)} modules loaded\n"
+    )
+
+    print(f"{'cumulative':>11} {'self':>9}  module")
+    for module, self_us, cumulative_us, _ in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f"{cumulative_us / 1000:>9.1f}ms {self_us / 1000:>7.1f}ms  {module}")
+
+    loaded = {module.split(".")[0] for module, *_ in rows}
+    eager = [name for name in HEAVY if name in loaded]
+    print(f"\nHeavy packages loaded at import: {', '.join(eager) or 'none'}")
@@ -0,0 +1,201 @@
+"""
+Local stand-in for the external services the app talks to, for working and
+testing offline. Run it with
+
+    python scripts/stub_server.py [port]
+
+Endpoints:
+  GET /image/<width>x<height>.jpg   a generated JPEG of that size
+  GET /search?q=...                 Nominatim-style search: one result with
+                                    made-up coordinates, none if q has "nowhere"
+  GET /status/<code>[?retry_after=s] that status, with Retry-After if given
+  GET /flaky/<name>/<n>             503 (Retry-After: 0) for the first n calls
+                                    per name, then 200
+  POST /api/interpreter             Overpass-style country relations for ISO
+                                    code regexes and name filters (point
+                                    OVERPASS_URL here); AQ, BV and UM only
+                                    match by name, and only Bouvet Island does
+  POST /api/generate                Ollama-style streaming generation: canned
+                                    enrichment patches or new places, depending
+                                    on the prompt (point OLLAMA_URL here)
+"""
+
+import hashlib
+import io
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (70, 130, 180)).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def _llm_response(prompt: str) -> str:
+    """Enrichment prompts get patches for the given items, add prompts new places."""
+    dataset = re.search(r"```json\s*(\[.*?\])\s*```", prompt, re.DOTALL)
+    if dataset and '"id"' in dataset.group(1):
+        patches = [
+            {
+                "id": item["id"],
+                "metadata": {
+                    "budget_level": "medium",
+                    "access_notes": "Stub access notes.",
+                },
+            }
+            for item in json.loads(dataset.group(1))
+        ]
+        return json.dumps(patches, indent=2)
+
+    count = re.search(r"Generate (\d+) destinations", prompt)
+    batch = re.search(r"batch (\d+) of", prompt)
+    prefix = f"stub-{batch.group(1) if batch else 1}"
+    places = [
+        {
+            "id": f"{prefix}-{i}",
+            "name": f"Stub Place {prefix} {i}",
+            "geo_query": "Manila, Philippines",
+            "image_query": "manila intramuros",
+            "country": "Philippines",
+            "location_type": "city",
+            "category": "city",
+            "metadata": {"status": "maybe", "score": 0.5, "images": []},
+            "annotations": [{"id": "a1", "text": "A stub place."}],
+        }
+        for i in range(int(count.group(1)) if count else 3)
+    ]
+    return json.dumps(places, indent=2)
+
+
+def _search_results(query: str) -> list:
+    if "nowhere" in query.lower():
+        return []
+    digest = hashlib.sha256(query.encode()).digest()
+    lat, lon = digest[0] / 255 * 30 - 10, digest[1] / 255 * 35 + 95
+    return [
+        {
+            "display_name": query,
+            "lat": str(lat),
+            "lon": str(lon),
+            "boundingbox": None,
+            "geojson": {"type": "Point", "coordinates": [lon, lat]},
+        }
+    ]
+
+
+_flaky_calls = Counter()
+_UNTAGGED = {"AQ", "BV", "UM"}
+
+
+def _overpass_elements(query: str) -> list:
+    """Fake country relations with made-up ids for the filters in `query`."""
+    time.sleep(0.2)  # a busy Overpass instance takes far longer
+    elements = []
+    codes = re.search(r'\["ISO3166-1"~"\^\(([A-Z|]+)\)\$"\]', query)
+    for code in codes.group(1).split("|") if codes else []:
+        if code not in _UNTAGGED:
+            relation_id = int.from_bytes(code.encode(), "big")
+            elements.append(
+                {"type": "relation", "id": relation_id, "tags": {"ISO3166-1": code}}
+            )
+    for name in re.findall(r'\["name:en"="([^"]+)"\]', query):
+        if name == "Bouvet Island":
+            elements.append(
+                {"type": "relation", "id": 2425963, "tags": {"name:en": name}}
+            )
+    return elements
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _send(self, status: int, body: bytes, content_type: str, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        image = re.fullmatch(r"/image/(\d+)x(\d+)\.jpg", url.path)
+        if image:
+            width, height = int(image.group(1)), int(image.group(2))
+            return self._send(200, _jpeg(width, height), "image/jpeg")
+        if url.path == "/search":
+            body = json.dumps(_search_results(query.get("q", ""))).encode()
+            return self._send(200, body, "application/json")
+        status = re.fullmatch(r"/status/(\d+)", url.path)
+        if status:
+            headers = (
+                {"Retry-After": query["retry_after"]} if "retry_after" in query else {}
+            )
+            return self._send(int(status.group(1)), b"status", "text/plain", headers)
+        flaky = re.fullmatch(r"/flaky/([\w-]+)/(\d+)", url.path)
+        if flaky:
+            _flaky_calls[flaky.group(1)] += 1
+            if _flaky_calls[flaky.group(1)] <= int(flaky.group(2)):
+                return self._send(503, b"try again", "text/plain", {"Retry-After": "0"})
+            return self._send(200, b"ok", "text/plain")
+        self._send(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/api/interpreter":
+            query = parse_qs(body.decode()).get("data", [""])[0]
+            payload = json.dumps({"elements": _overpass_elements(query)}).encode()
+            return self._send(200, payload, "application/json")
+        if self.path == "/api/generate":
+            request = json.loads(body or b"{}")
+            text = _llm_response(request.get("prompt", ""))
+            if not request.get("stream", True):
+                payload = json.dumps({"response": text, "done": True}).encode()
+                return self._send(200, payload, "application/json")
+            # Stream a few characters per line, like tokens from a local model
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for i in range(0, len(text), 24):
+                line = {
+                    "model": request.get("model"),
+                    "response": text[i : i + 24],
+                    "done": False,
+                }
+                self.wfile.write(json.dumps(line).encode() + b"\n")
+                self.wfile.flush()
+                time.sleep(0.002)
+            self.wfile.write(
+                json.dumps({"response": "", "done": True}).encode() + b"\n"
+            )
+            return
+        self._send(404, b"not found", "text/plain")
+
+    def log_message(self, format, *args):
+        pass  # keep test output quiet
+
+
+def start_stub_server(port: int = 0):
+    """Starts the server on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server, base_url = start_stub_server(port)
+    print(f"🧪 Stub server running at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,18 @@
+"""Run from the repo root with `python -m pytest tests`."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.stub_server import start_stub_server  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def stub_url():
+    """Base URL of scripts/stub_server.py, running for the whole session."""
+    server, base_url = start_stub_server()
+    yield base_url
+    server.shutdown()
@@ -0,0 +1,94 @@
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from lib import http_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(http_client, "_metrics", {})
+    monkeypatch.setattr(http_client, "_next_slot", {})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records the backoff sleeps of http_client instead of waiting them out."""
+    recorded = []
+    monkeypatch.setattr(http_client.time, "sleep", recorded.append)
+    return recorded
+
+
+def _response(retry_after=None):
+    response = requests.Response()
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+def test_retry_after_seconds():
+    assert http_client.retry_after_seconds(_response()) is None
+    assert http_client.retry_after_seconds(_response("7")) == 7.0
+    assert http_client.retry_after_seconds(_response("-3")) == 0.0
+    assert http_client.retry_after_seconds(_response("soon")) is None
+    in_a_minute = formatdate(time.time() + 60, usegmt=True)
+    assert 55 < http_client.retry_after_seconds(_response(in_a_minute)) <= 60
+
+
+def test_backoff_prefers_retry_after_and_caps_it():
+    assert http_client.backoff_seconds(0, _response("2")) == 2.0
+    assert http_client.backoff_seconds(0, _response("3600")) == http_client.BACKOFF_MAX
+
+
+def test_backoff_grows_exponentially(monkeypatch):
+    monkeypatch.setattr(http_client.random, "uniform", lambda low, high: high)
+    delays = [http_client.backoff_seconds(attempt) for attempt in range(8)]
+    assert delays[:4] == [http_client.BACKOFF_BASE * 2**i for i in range(4)]
+    assert delays[-1] == http_client.BACKOFF_MAX
+
+
+def test_retries_until_success(stub_url, sleeps):
+    response = http_client.get(f"{stub_url}/flaky/until-success/2")
+    assert response.status_code == 200
+    assert sleeps == [0.0, 0.0]  # the stub's Retry-After: 0
+    [metrics] = http_client.get_metrics()
+    assert (metrics["requests"], metrics["errors"], metrics["retries"]) == (3, 2, 2)
+
+
+def test_returns_last_response_when_retries_run_out(stub_url, sleeps):
+    response = http_client.get(f"{stub_url}/status/503?retry_after=1", retries=2)
+    assert response.status_code == 503
+    assert sleeps == [1.0, 1.0]
+
+
+def test_does_not_retry_client_errors(stub_url, sleeps):
+    response = http_client.get(f"{stub_url}/status/404")
+    assert response.status_code == 404
+    assert sleeps == []
+    assert http_client.get_metrics()[0]["requests"] == 1
+
+
+def test_spaces_requests_to_rate_limited_hosts(stub_url, monkeypatch):
+    host = http_client._host(stub_url)
+    monkeypatch.setitem(http_client.HOST_MIN_INTERVAL, host, 0.2)
+    started = time.monotonic()
+    for _ in range(3):
+        http_client.get(f"{stub_url}/status/200")
+    assert time.monotonic() - started >= 0.4
+
+
+def test_get_metrics_percentiles():
+    for ms in range(1, 101):
+        http_client._record("example.com", ms / 1000, 200, False)
+    http_client._record("example.com", 0.05, 500, True)
+    [metrics] = http_client.get_metrics()
+    assert metrics == {
+        "host": "example.com",
+        "requests": 101,
+        "errors": 1,
+        "retries": 1,
+        "p50 (ms)": 50.0,
+        "p95 (ms)": 95.0,
+    }
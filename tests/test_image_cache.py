@@ -0,0 +1,84 @@
+import base64
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from lib import image_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(image_cache, "_total_bytes", None)
+    return tmp_path
+
+
+def _jpeg(width=400, height=300, color=(200, 80, 40)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def test_get_thumbnail_fetches_once(stub_url):
+    url = f"{stub_url}/image/800x600.jpg"
+    path = image_cache.get_thumbnail(url)
+    with Image.open(path) as thumb:
+        assert (thumb.format, thumb.size) == ("JPEG", image_cache.THUMB_SIZE)
+
+    def fetch(url):
+        raise AssertionError("cached thumbnails are not fetched again")
+
+    assert image_cache.get_thumbnail(url, fetch=fetch) == path
+
+
+def test_get_thumbnail_returns_none_on_errors(stub_url, cache_dir):
+    assert image_cache.get_thumbnail(f"{stub_url}/status/404") is None
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_evicts_least_recently_used(cache_dir):
+    first = image_cache.get_thumbnail("a", fetch=lambda url: _jpeg())
+    second = image_cache.get_thumbnail("b", fetch=lambda url: _jpeg())
+    size = os.path.getsize(first)
+    os.utime(first, (1000, 1000))
+    os.utime(second, (2000, 2000))
+    # Using "a" again makes "b" the least recently used
+    assert image_cache.get_thumbnail("a") == first
+
+    third = image_cache.get_thumbnail(
+        "c", fetch=lambda url: _jpeg(), max_bytes=int(size * 2.5)
+    )
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert image_cache._total_bytes == sum(
+        os.path.getsize(path) for path in (first, third)
+    )
+
+
+def test_prefetch_thumbnails_fetches_missing_urls_once():
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return _jpeg()
+
+    image_cache.prefetch_thumbnails(["a", "b", "a"], fetch=fetch)
+    image_cache.prefetch_thumbnails(["a", "b", "c"], fetch=fetch)
+    assert sorted(fetched) == ["a", "b", "c"]
+
+
+def test_local_image_src():
+    url = "https://images.example/photo.jpg"
+    assert image_cache.local_image_src(url) == url  # not cached: remote url
+
+    path = image_cache.get_thumbnail(url, fetch=lambda url: _jpeg())
+    assert image_cache.local_image_src(url) == (
+        f"{image_cache.STATIC_URL_PREFIX}/{os.path.basename(path)}"
+    )
+    src = image_cache.local_image_src(url, inline=True)
+    prefix = "data:image/jpeg;base64,"
+    assert src.startswith(prefix)
+    with open(path, "rb") as f:
+        assert base64.b64decode(src[len(prefix) :]) == f.read()
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+
+from lib import llm_cache
+from lib.llm_provider import OllamaProvider, generate_entries
+
+
+@pytest.fixture(autouse=True)
+def local_cache_only(monkeypatch):
+    """A fresh in-process tier and no DynamoDB behind it."""
+    monkeypatch.setattr(llm_cache, "_local", OrderedDict())
+    monkeypatch.setattr(llm_cache, "_inflight", {})
+    monkeypatch.setattr(llm_cache, "get_cached", lambda key: None)
+    monkeypatch.setattr(llm_cache, "put_cached", lambda key, data, ttl: None)
+
+
+class CountingProvider(OllamaProvider):
+    """The stub server's /api/generate, counting requests and how many overlap."""
+
+    def __init__(self, base_url):
+        super().__init__(base_url=base_url)
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def stream(self, prompt, system=None, **params):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.05)  # long enough for the other workers to start
+            yield from super().stream(prompt, system, **params)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _prompts(count, places=2):
+    return [
+        f"Generate {places} destinations. This is batch {i + 1} of {count}."
+        for i in range(count)
+    ]
+
+
+def _ids(results):
+    return sorted((index, entry["id"]) for index, entry, _, _ in results)
+
+
+def test_runs_at_most_max_concurrency_requests(stub_url):
+    provider = CountingProvider(stub_url)
+    results = list(generate_entries(_prompts(6), provider, max_concurrency=2))
+    assert provider.calls == 6
+    assert provider.max_active == 2
+    assert len(results) == 12
+
+
+def test_parses_entries_split_across_chunks(stub_url):
+    provider = CountingProvider(stub_url)
+    results = list(generate_entries(_prompts(1, places=3), provider))
+    # The stub streams 24 characters per chunk, so every entry spans several
+    assert [error for _, _, error, _ in results] == [None] * 3
+    assert _ids(results) == [(0, f"stub-1-{i}") for i in range(3)]
+    assert all(entry["name"] in raw for _, entry, _, raw in results)
+
+
+def test_cached_responses_are_not_requested_again(stub_url):
+    provider = CountingProvider(stub_url)
+    first = list(generate_entries(_prompts(2), provider))
+    again = list(generate_entries(_prompts(2), provider))
+    assert provider.calls == 2
+    assert _ids(again) == _ids(first)
+
+
+def test_identical_prompts_in_flight_share_one_request(stub_url):
+    provider = CountingProvider(stub_url)
+    prompt = _prompts(1)[0]
+    results = list(generate_entries([prompt, prompt], provider))
+    assert provider.calls == 1
+    assert _ids(results) == [
+        (0, "stub-1-0"),
+        (0, "stub-1-1"),
+        (1, "stub-1-0"),
+        (1, "stub-1-1"),
+    ]
@@ -0,0 +1,48 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _widget_types_script():
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    from lib.rerun_tracker import _value_type
+
+    st.button("Go", key="go")
+    st.checkbox("Check", key="check")
+    st.text_input("Text", key="text")
+    ctx = get_script_run_ctx()
+    st.session_state.value_types = {
+        key: _value_type(ctx, key) for key in ("go", "check", "text")
+    }
+
+
+def test_value_type_reads_widget_types():
+    # _value_type reads Streamlit internals; if they move it returns None and
+    # clicks on buttons stop being told apart from other widget changes
+    at = AppTest.from_function(_widget_types_script).run()
+    assert not at.exception
+    assert at.session_state.value_types == {
+        "go": "trigger_value",
+        "check": "bool_value",
+        "text": "string_value",
+    }
+
+
+def _tracked_script():
+    import streamlit as st
+
+    from lib.rerun_tracker import finish_run, start_run
+
+    start_run()
+    st.button("Go", key="go")
+    st.checkbox("Check", key="check")
+    finish_run()
+
+
+def test_button_click_is_a_trigger_only_once():
+    at = AppTest.from_function(_tracked_script).run()
+    at.button(key="go").click().run()
+    at.run()
+    at.checkbox(key="check").check().run()
+    triggers = [run["trigger"] for run in at.session_state["_rerun_log"]]
+    assert triggers == ["page load", "go", "page load", "check"]